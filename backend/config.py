@@ -1,3 +1,6 @@
+import os
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,6 +9,99 @@ class Settings(BaseSettings):
     PINECONE_API_KEY: str
     INDEX_NAME: str = "medical-rag-index"
     API_ACCESS_KEY: str | None = None
+    PDF_DIR: str = "data"
+    UPLOAD_DIR: str = os.path.join("storage", "uploads")  # uploaded PDFs, indexed with PDF_DIR
+
+    # Chunking (characters, or tokens when CHUNK_BY_TOKENS is set)
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 200
+    CHUNK_BY_TOKENS: bool = False
+
+    # Shared on-disk vector index (see services/index_store.py)
+    INDEX_DIR: str = os.path.join("storage", "vector_index")
+    INDEX_RELOAD_INTERVAL_S: float = 5.0
+    INDEX_SHARDS: int = 4  # documents are partitioned by source hash
+    INDEX_BUILD_WORKERS: int = 4  # shards built in parallel
+    WARMUP_RETRY_S: float = 5.0  # first retry after a failed warm-up, doubling
+    WARMUP_RETRY_MAX_S: float = 300.0
+
+    # Local embedding backend (see services/embeddings.py)
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # "torch" | "onnx"
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_THREADS: int | None = None  # intra-op threads; None = library default
+    EMBEDDING_QUANTIZE: bool = False  # int8 dynamic quantization
+    EMBEDDING_ONNX_DIR: str = os.path.join("backend", "data", "onnx", "all-MiniLM-L6-v2")
+    EMBEDDING_VALIDATE: bool = False  # check cosine agreement with torch fp32 on load
+    EMBEDDING_MIN_COSINE: float = 0.99
+
+    # Durable vector store written by indexing (see services/vectorstores.py)
+    VECTOR_STORE: str = "pinecone"  # "pinecone" | "memory" | "faiss" (local only)
+    VECTOR_STORE_CONCURRENCY: int = 4
+    VECTOR_STORE_RETRIES: int = 4
+
+    # LLM model routing (see services/model_router.py); tiers fastest first
+    MODEL_TIERS: Dict[str, str] = {"fast": "gpt-4o-mini", "standard": "gpt-4o"}
+    MODEL_TASK_TIERS: Dict[str, str] = {
+        "classifier": "fast",
+        "answer": "standard",
+        "fallback": "standard",
+        "reformat": "fast",
+    }
+    # Expected latency per tier until enough calls have been observed
+    MODEL_TIER_LATENCY_MS: Dict[str, float] = {"fast": 4000.0, "standard": 15000.0}
+    ROUTER_SIMPLE_MAX_WORDS: int = 12  # longer questions count as complex
+    ROUTER_CONFIDENT_DISTANCE: float = 0.8  # best retrieval L2 distance at or below = confident
+
+    # Per-request deadline (see services/deadlines.py); 0 disables.
+    # Each stage may use its share of the budget left when it starts.
+    REQUEST_DEADLINE_MS: float = 45000.0
+    DEADLINE_STAGE_SHARES: Dict[str, float] = {
+        "classifier": 0.2,
+        "retrieval": 0.2,
+        "generation": 0.85,
+        "fallback": 0.85,
+        "reformat": 1.0,
+    }
+
+    # Hedged LLM requests (see services/hedging.py)
+    HEDGE_ENABLED: bool = False
+    HEDGE_TASKS: List[str] = ["classifier", "answer"]
+    HEDGE_PERCENTILE: float = 0.95  # hedge after this percentile of recent latency
+    HEDGE_DEFAULT_DELAY_MS: float = 5000.0  # until enough calls were observed
+    HEDGE_MIN_DELAY_MS: float = 250.0
+
+    # Chat admission control (see services/admission.py)
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_CONCURRENCY_PER_KEY: int = 4
+    # Unauthenticated frontend /chat traffic shares this bucket and cap
+    PUBLIC_CHAT_BUCKET: str = "public-chat"
+    PUBLIC_CHAT_MAX_CONCURRENCY: int = 6
+    ADMISSION_QUEUE_SIZE: int = 32
+    ADMISSION_TIMEOUT_S: float = 10.0
+    ADMISSION_RETRY_AFTER_S: int = 5
+
+    # SSE token framing: batch tokens per frame (0 = one frame per token)
+    SSE_FLUSH_INTERVAL_MS: float = 40.0
+    SSE_FLUSH_CHARS: int = 256
+
+    # WebSocket chat transport
+    WS_KEEPALIVE_S: float = 20.0
+
+    # Retrieval result cache: LRU entries of (query, k, index version) -> ids/scores
+    RETRIEVAL_CACHE_SIZE: int = 4096  # 0 disables
+
+    # Opt-in request profiling (X-Profile header on /api/chat, or sampled)
+    PROFILE_SAMPLE_RATE: float = 0.0  # share of chat requests profiled without the header
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILE_MAX_SAMPLERS: int = 2  # concurrent stack samplers; extra profiles get spans only
+    PROFILE_BUFFER_SIZE: int = 50
+
+    # Request log and precomputed response cache (see services/response_cache.py)
+    QUERY_LOG_PATH: str = os.path.join("storage", "query_logs.jsonl")
+    LOG_QUERY_TEXT: bool = False  # include question text, for cache warming
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_PATH: str = os.path.join("storage", "response_cache.sqlite3")
 
     class Config:
         env_file = ".env"
@@ -4,7 +4,7 @@ from backend.config import settings
 
 def verify_api_key(
     x_api_key: str = Header(..., description="API access key for authentication")
-) -> None:
+) -> str:
     """
     Dependency function to verify the provided API key matches
     the server's configured key.
@@ -12,6 +12,9 @@ def verify_api_key(
     Args:
         x_api_key (str): The API key provided in the request header.
 
+    Returns:
+        str: The verified key, so routes can apply per-key limits.
+
     Raises:
         HTTPException: If the API key is missing or invalid.
     """
@@ -29,3 +32,5 @@ def verify_api_key(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key",
         )
+
+    return x_api_key
@@ -1,19 +1,39 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from typing import List
 
-from backend.routes import chat, index, memory, metrics
+from backend.config import settings
+from backend.routes import chat, index, memory, metrics, profiles
 from backend.routes.chat import chat_handler
 from backend.routes.index import upload_pdf_handler
 from backend.schemas.chat import ChatRequest
+from backend.services.retriever import watch_published
+from backend.services.warmup import readiness, warm_up
 
+import asyncio
 import uuid
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm heavy components in the background; /api/ready reports progress
+    warmup_task = asyncio.create_task(warm_up())
+    # Picks up index versions published by other workers, off the request path
+    reload_task = asyncio.create_task(watch_published())
+    yield
+    warmup_task.cancel()
+    reload_task.cancel()
+
+
 # Create FastAPI app instance
 app = FastAPI(
     title="Medical Chatbot API",
     version="1.0.0",
-    description="API for a RAG-powered medical chatbot with indexing, memory, and chat endpoints."
+    description="API for a RAG-powered medical chatbot with indexing, memory, and chat endpoints.",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -34,6 +54,7 @@ app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(index.router, prefix="/api/index", tags=["Indexing"])
 app.include_router(memory.router, prefix="/api/memory", tags=["Memory"])
 app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["Profiling"])
 
 
 @app.get("/api/health")
@@ -41,6 +62,13 @@ def health_check():
     return {"status": "ok", "message": "Medical Chatbot API is running"}
 
 
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness probe: 200 once the model, index and LLM client are warm, else 503."""
+    state = readiness()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+
 # -------------------------
 # ✅ Top-level endpoints for frontend
 # -------------------------
@@ -57,11 +85,12 @@ async def chat_with_bot(request: ChatRequest):
     if not request.conversation_id:
         request.conversation_id = str(uuid.uuid4())
 
-    resp = await chat_handler(request)
+    # No API key on this route: admit it under its own configured bucket
+    resp = await chat_handler(request, api_key=settings.PUBLIC_CHAT_BUCKET)
 
     return {
         "answer": resp.answer,
-+       "sources": resp.sources,
+        "sources": resp.sources,
         "conversation_id": request.conversation_id
     }
 
@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
+from backend.config import settings
 from backend.schemas.chat import ChatRequest, ChatResponse
-from backend.services.llm import get_llm_response, stream_llm_response
+from backend.services.coalescing import StreamSubscription, coalesced_llm_response, open_coalesced_stream
 from backend.dependencies.auth import verify_api_key
 from backend.utils.safety import safety_check
 from backend.services.metrics import log_query
+from backend.services.deadlines import DeadlineExceeded, start_deadline
+from backend.services.profiling import RequestProfile, current_profile, should_profile, span, start_profile
+from backend.services.response_cache import get_cached_response
+from backend.services.retriever import get_index_version
+from backend.services.warmup import index_ready, readiness
+from backend.utils.memory import add_message, get_history
+from backend.utils.sse import coalesce_tokens, is_sendable, sse_frame
+import asyncio
 import json
+import uuid
 
-from typing import AsyncGenerator, Union
+from typing import AsyncGenerator, Dict, List, Optional, Tuple, Union
 import time
 
 router = APIRouter()
@@ -17,16 +28,165 @@ router = APIRouter()
 @router.post("")
 async def chat_endpoint(
     payload: ChatRequest,
+    response: Response,
     stream: bool = Query(False, description="Enable streaming mode"),
-    _=Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    x_profile: Optional[str] = Header(None, description="Set to 1 to profile this request"),
 ):
     """
     Handles chat requests with optional streaming.
 
     - If stream=true → streams the response token-by-token using SSE.
     - Otherwise → returns the full response at once.
+    - With X-Profile: 1 (or when sampled), the request is profiled and the
+      profile id is returned in X-Profile-Id (see /api/profiles).
     """
-    return await chat_handler(payload, stream)
+    if not should_profile(x_profile == "1"):
+        return await chat_handler(payload, stream, api_key=api_key)
+
+    profile = start_profile("chat stream" if stream else "chat")
+    try:
+        result = await chat_handler(payload, stream, api_key=api_key)
+    except BaseException:
+        profile.finish()
+        raise
+
+    if isinstance(result, StreamingResponse):
+        # Finished by ChatStream.close() once the stream is done
+        result.headers["X-Profile-Id"] = profile.id
+    else:
+        profile.finish()
+        response.headers["X-Profile-Id"] = profile.id
+    return result
+
+
+# ----------------------------------------------------------
+# Shared pieces of a chat turn (HTTP, SSE and WebSocket)
+# ----------------------------------------------------------
+def _cached_answer(payload: ChatRequest, start_time: float) -> Optional[Tuple[str, List]]:
+    """
+    Precomputed answer for a frequent question — no LLM call needed.
+    A hit is recorded in conversation memory like a live answer.
+
+    Only for the first turn of a conversation: cached answers were made
+    without history, and a follow-up's answer depends on it.
+    """
+    if payload.conversation_id and get_history(payload.conversation_id):
+        return None
+
+    with span("response_cache"):
+        cached = get_cached_response(payload.message, get_index_version())
+    if cached is None:
+        return None
+
+    answer, sources = cached
+    add_message(payload.conversation_id, "user", payload.message)
+    add_message(payload.conversation_id, "assistant", answer)
+
+    latency_ms = (time.perf_counter() - start_time) * 1000
+    log_query(latency_ms, question=payload.message, cache_hit=True)
+
+    return answer, sources
+
+
+def _require_index() -> None:
+    """
+    503 until warm-up has opened the index. Opening it from a request would
+    build it (or wait on another worker's build) on the event loop.
+    """
+    if index_ready():
+        return
+    error = readiness()["error"]
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Index unavailable: {error}" if error else "The document index is still loading",
+        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_S)},
+    )
+
+
+def _sources_chunk(sources: List) -> str:
+    return json.dumps({"type": "sources", "data": sources})
+
+
+def parse_sources_chunk(chunk: str) -> Optional[List]:
+    """Return the sources list if chunk is the final sources chunk, else None."""
+    if not chunk.startswith('{"type": "sources"'):
+        return None
+    try:
+        return json.loads(chunk)["data"]
+    except (ValueError, KeyError):
+        return None
+
+
+def _is_sources_chunk(chunk: str) -> bool:
+    return parse_sources_chunk(chunk) is not None
+
+
+async def _replay(answer: str, sources: List) -> AsyncGenerator[str, None]:
+    yield answer
+    yield _sources_chunk(sources)
+
+
+class ChatStream:
+    """
+    Chunks of one streamed chat turn: answer tokens, then the sources chunk.
+    Unsubscribes from the generation (cancelling it if nobody else follows
+    it) and finishes the request profile, if any, once exhausted, cancelled
+    or closed.
+    """
+
+    def __init__(self, chunks: Union[AsyncGenerator[str, None], StreamSubscription]):
+        self._chunks = chunks
+        self._profile: Optional[RequestProfile] = current_profile()
+
+    async def __aiter__(self) -> AsyncGenerator[str, None]:
+        try:
+            async for chunk in self._chunks:
+                if is_sendable(chunk):
+                    yield chunk
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if isinstance(self._chunks, StreamSubscription):
+            self._chunks.close()
+        if self._profile is not None:
+            self._profile.finish()
+            self._profile = None
+
+
+async def open_chat_stream(
+    payload: ChatRequest,
+    api_key: Optional[str] = None,
+) -> ChatStream:
+    """
+    Run the pre-generation steps of a streamed turn (safety check,
+    response cache, admission control) and return its chunk stream.
+    Raises HTTPException on rejection, before anything is streamed.
+    """
+    start_deadline(payload.latency_budget_ms)
+
+    # Step 1: Safety check
+    with span("safety_check"):
+        safety_check(payload.message)
+
+    # Step 2: Precomputed answer
+    cached = _cached_answer(payload, time.perf_counter())
+    if cached is not None:
+        return ChatStream(_replay(*cached))
+
+    # Step 3: Join a running generation, or pass admission control to start
+    # one — fast 429/503 instead of piling onto the LLM
+    _require_index()
+    with span("admission"):
+        chunks = await open_coalesced_stream(
+            conversation_id=payload.conversation_id,
+            user_message=payload.message,
+            latency_budget_ms=payload.latency_budget_ms,
+            api_key=api_key,
+        )
+
+    return ChatStream(chunks)
 
 
 # ----------------------------------------------------------
@@ -34,50 +194,238 @@ async def chat_endpoint(
 # ----------------------------------------------------------
 async def chat_handler(
     payload: ChatRequest,
-    stream: bool = False
+    stream: bool = False,
+    api_key: Optional[str] = None,
 ) -> Union[ChatResponse, StreamingResponse]:
 
-    # Step 1: Safety check
-    safety_check(payload.message)
-
     start_time = time.perf_counter()
 
     # ----------------------------------------------------------
     # STREAMING MODE
     # ----------------------------------------------------------
     if stream:
+        chat_stream = await open_chat_stream(payload, api_key)
 
         async def event_generator() -> AsyncGenerator[bytes, None]:
             try:
-                async for chunk in stream_llm_response(
-                    conversation_id=payload.conversation_id,
-                    user_message=payload.message
+                # Batch tokens into fewer frames (first token still goes out at once)
+                async for piece in coalesce_tokens(
+                    chat_stream,
+                    interval_s=settings.SSE_FLUSH_INTERVAL_MS / 1000,
+                    max_chars=settings.SSE_FLUSH_CHARS,
+                    standalone=_is_sources_chunk,
                 ):
-                    if not chunk or not chunk.strip():
-                        continue
-                    yield f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+                    yield sse_frame(piece)
 
             except Exception as e:
                     yield f"data: {json.dumps('[ERROR] ' + str(e))}\n\n".encode("utf-8")
                     return  # ⛔ stop stream immediately
 
-        
             yield b"data: [DONE]\n\n"
 
         latency_ms = (time.perf_counter() - start_time) * 1000
-        log_query(latency_ms)
+        log_query(latency_ms, question=payload.message)
 
-        return StreamingResponse(event_generator(), media_type="text/event-stream")
+        # The background task covers a response that is never iterated
+        return StreamingResponse(
+            event_generator(),
+            media_type="text/event-stream",
+            background=BackgroundTask(chat_stream.close),
+        )
 
     # ----------------------------------------------------------
     # NON-STREAMING MODE
     # ----------------------------------------------------------
-    answer, sources = await get_llm_response(
-        conversation_id=payload.conversation_id,
-        user_message=payload.message
-    )
+    start_deadline(payload.latency_budget_ms)
+
+    # Step 1: Safety check
+    with span("safety_check"):
+        safety_check(payload.message)
+
+    # Step 2: Precomputed answer
+    cached = _cached_answer(payload, start_time)
+    if cached is not None:
+        answer, sources = cached
+        return ChatResponse(answer=answer, sources=sources)
+
+    # Step 3: Join a running answer, or pass admission control to start one
+    _require_index()
+    try:
+        answer, sources = await coalesced_llm_response(
+            conversation_id=payload.conversation_id,
+            user_message=payload.message,
+            latency_budget_ms=payload.latency_budget_ms,
+            api_key=api_key,
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
 
     latency_ms = (time.perf_counter() - start_time) * 1000
-    log_query(latency_ms)
+    log_query(latency_ms, question=payload.message)
 
     return ChatResponse(answer=answer, sources=sources)
+
+
+# ----------------------------------------------------------
+# WebSocket transport: one authenticated connection, many conversations
+# ----------------------------------------------------------
+#
+# Client → server:
+#   {"type": "chat", "conversation_id": "...", "message": "...", "latency_budget_ms": 5000}
+#   {"type": "cancel", "conversation_id": "..."}
+#   {"type": "pong"}
+# Server → client (all tagged with conversation_id except ping):
+#   {"type": "token", "data": "..."}      streamed answer text
+#   {"type": "sources", "data": [...]}
+#   {"type": "done"} | {"type": "cancelled"}
+#   {"type": "error", "status": 429, "detail": "..."}
+#   {"type": "ping"}                       keepalive
+
+class _ChatSocket:
+    def __init__(self, websocket: WebSocket, api_key: str):
+        self.websocket = websocket
+        self.api_key = api_key
+        self._send_lock = asyncio.Lock()
+        self._generations: Dict[str, asyncio.Task] = {}
+        self._closed = False
+
+    async def send(self, message: Dict) -> None:
+        if self._closed:
+            return
+        try:
+            async with self._send_lock:
+                await self.websocket.send_json(message)
+        except Exception:
+            # Client went away; run() cancels the remaining generations
+            self._closed = True
+
+    async def keepalive(self) -> None:
+        while True:
+            await asyncio.sleep(settings.WS_KEEPALIVE_S)
+            await self.send({"type": "ping"})
+
+    async def generate(self, payload: ChatRequest) -> None:
+        conversation_id = payload.conversation_id
+        start_time = time.perf_counter()
+        chat_stream = None
+
+        try:
+            chat_stream = await open_chat_stream(payload, self.api_key)
+            async for chunk in chat_stream:
+                sources = parse_sources_chunk(chunk)
+                if sources is not None:
+                    await self.send({"type": "sources", "conversation_id": conversation_id, "data": sources})
+                else:
+                    await self.send({"type": "token", "conversation_id": conversation_id, "data": chunk})
+            await self.send({"type": "done", "conversation_id": conversation_id})
+
+        except asyncio.CancelledError:
+            await self.send({"type": "cancelled", "conversation_id": conversation_id})
+        except HTTPException as e:
+            await self.send({
+                "type": "error",
+                "conversation_id": conversation_id,
+                "status": e.status_code,
+                "detail": e.detail,
+            })
+        except DeadlineExceeded as e:
+            await self.send({
+                "type": "error",
+                "conversation_id": conversation_id,
+                "status": 504,
+                "detail": str(e),
+            })
+        except Exception as e:
+            await self.send({
+                "type": "error",
+                "conversation_id": conversation_id,
+                "status": 500,
+                "detail": str(e),
+            })
+        finally:
+            if chat_stream is not None:
+                chat_stream.close()  # stop the generation even on cancel
+            self._generations.pop(conversation_id, None)
+            log_query((time.perf_counter() - start_time) * 1000, question=payload.message)
+
+    def start(self, message: Dict) -> Optional[Dict]:
+        conversation_id = message.get("conversation_id")
+        if conversation_id is not None and not isinstance(conversation_id, str):
+            return {"type": "error", "status": 422, "detail": "conversation_id must be a string"}
+        conversation_id = conversation_id or str(uuid.uuid4())
+        text = message.get("message")
+
+        if not isinstance(text, str) or not text.strip():
+            return {"type": "error", "conversation_id": conversation_id, "status": 422, "detail": "message is required"}
+        if conversation_id in self._generations:
+            return {
+                "type": "error",
+                "conversation_id": conversation_id,
+                "status": 409,
+                "detail": "A generation is already running for this conversation",
+            }
+
+        budget = message.get("latency_budget_ms")
+        if budget is not None and (isinstance(budget, bool) or not isinstance(budget, (int, float))):
+            return {"type": "error", "conversation_id": conversation_id, "status": 422, "detail": "latency_budget_ms must be a number"}
+
+        payload = ChatRequest(message=text, conversation_id=conversation_id, latency_budget_ms=budget)
+        self._generations[conversation_id] = asyncio.create_task(self.generate(payload))
+        return None
+
+    def cancel(self, conversation_id: Optional[str]) -> Optional[Dict]:
+        if not isinstance(conversation_id, str):
+            return {"type": "error", "status": 422, "detail": "conversation_id must be a string"}
+        task = self._generations.get(conversation_id)
+        if task is not None:
+            task.cancel()
+        return None
+
+    async def run(self) -> None:
+        keepalive = asyncio.create_task(self.keepalive())
+        try:
+            while True:
+                try:
+                    message = await self.websocket.receive_json()
+                except ValueError:
+                    await self.send({"type": "error", "status": 400, "detail": "Invalid JSON"})
+                    continue
+
+                kind = message.get("type") if isinstance(message, dict) else None
+
+                if kind == "chat":
+                    error = self.start(message)
+                    if error:
+                        await self.send(error)
+                elif kind == "cancel":
+                    error = self.cancel(message.get("conversation_id"))
+                    if error:
+                        await self.send(error)
+                elif kind != "pong":
+                    await self.send({"type": "error", "status": 400, "detail": f"Unknown message type: {kind!r}"})
+
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._closed = True
+            keepalive.cancel()
+            for task in list(self._generations.values()):
+                task.cancel()
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    WebSocket chat: authenticates once per connection (x-api-key header, or
+    ?api_key= for browsers) and multiplexes conversations by conversation_id.
+    """
+    api_key = websocket.headers.get("x-api-key") or websocket.query_params.get("api_key")
+
+    try:
+        verify_api_key(api_key)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    await _ChatSocket(websocket, api_key).run()
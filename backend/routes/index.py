@@ -1,21 +1,34 @@
 from fastapi import APIRouter, UploadFile, File
+import asyncio
 import tempfile
 import os
 
-from backend.services.retriever import index_documents
+from backend.config import settings
+from backend.services.retriever import delete_document, index_files
 from backend.schemas.index import IndexResponse
+from backend.utils.pdf_loader import file_sha256
 
 router = APIRouter()
 
 
+def _replace_upload(tmp: str, path: str) -> None:
+    # Same name, new content: drop the old version's chunks first
+    if os.path.exists(path) and file_sha256(path) != file_sha256(tmp):
+        delete_document(path)
+    os.replace(tmp, path)
+
+
 @router.post("/upload", response_model=IndexResponse)
 async def upload_pdf_handler(file: UploadFile = File(...)):
-    with tempfile.TemporaryDirectory() as tmp:
-        path = os.path.join(tmp, file.filename)
+    # Uploads are kept: rebuilds index UPLOAD_DIR along with PDF_DIR
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_DIR, os.path.basename(file.filename or "upload.pdf"))
 
-        with open(path, "wb") as f:
-            f.write(await file.read())
+    fd, tmp = tempfile.mkstemp(dir=settings.UPLOAD_DIR, prefix=".upload-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(await file.read())
 
-        count = await index_documents(tmp)
+    await asyncio.to_thread(_replace_upload, tmp, path)
+    count = await index_files([path])
 
     return IndexResponse(indexed_chunks=count)
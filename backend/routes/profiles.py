@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from backend.dependencies.auth import verify_api_key
+from backend.services.profiling import get_profile, list_profiles
+
+router = APIRouter(dependencies=[Depends(verify_api_key)])
+
+
+def _find(profile_id: str):
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (it may have been evicted)")
+    return profile
+
+
+@router.get("")
+def recent_profiles():
+    """Recent request profiles, newest first."""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/{profile_id}")
+def profile_detail(profile_id: str):
+    """Stage spans and sampled stacks for one request."""
+    return _find(profile_id).to_dict()
+
+
+@router.get("/{profile_id}/collapsed")
+def download_collapsed(profile_id: str):
+    """Collapsed-stack file for flamegraph.pl / speedscope."""
+    return PlainTextResponse(
+        _find(profile_id).collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.txt"'},
+    )
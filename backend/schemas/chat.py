@@ -11,6 +11,7 @@ class SourceDocument(BaseModel):
 class ChatRequest(BaseModel):
     message: str                        # renamed from prompt → message for clarity
     conversation_id: Optional[str] = None  # renamed from session_id → conversation_id
+    latency_budget_ms: Optional[float] = None  # lets the router pick a faster model
 
 
 class ChatResponse(BaseModel):
@@ -0,0 +1,124 @@
+"""
+Docstore memory: langchain InMemoryDocstore (one Document per chunk) vs.
+CompactDocstore, on a synthetic corpus shaped like our PDF chunks.
+
+    python -m backend.scripts.benchmark_docstore --chunks 200000
+
+Python heap is measured with tracemalloc. The memory-mapped store barely
+touches the heap; its text is file-backed and shared between workers, so
+its on-disk size is reported separately.
+"""
+import argparse
+import gc
+import os
+import pickle
+import random
+import tempfile
+import time
+import tracemalloc
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from backend.services.compact_docstore import CompactDocstore
+
+_WORDS = (
+    "insulin glucose pancreas cells blood levels type diabetes treatment "
+    "therapy patient clinical chronic acute symptoms diagnosis dose"
+).split()
+
+
+def _corpus(n_chunks: int, chunk_chars: int, pages_per_file: int, seed: int = 0):
+    """(id, Document) pairs with PyPDFLoader-like metadata."""
+    rng = random.Random(seed)
+    for i in range(n_chunks):
+        words, size = [], 0
+        while size < chunk_chars:
+            word = rng.choice(_WORDS)
+            words.append(word)
+            size += len(word) + 1
+        page = (i // 3) % pages_per_file
+        book = i // (3 * pages_per_file)
+        yield f"chunk-{i:08d}", Document(
+            page_content=" ".join(words),
+            metadata={
+                "source": f"data/book-{book:04d}.pdf",
+                "page": page,
+                "page_label": str(page + 1),
+                "total_pages": pages_per_file,
+                "producer": "pdfTeX-1.40.21",
+                "creator": "LaTeX",
+            },
+        )
+
+
+def _heap_mb(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current / 2**20, elapsed
+
+
+def _lookup_us(store, ids, k: int, repeats: int) -> float:
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for doc_id in rng.sample(ids, k):
+            store.search(doc_id)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def _dir_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--pages-per-file", type=int, default=300)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    corpus = lambda: _corpus(args.chunks, args.chunk_chars, args.pages_per_file)  # noqa: E731
+    ids = [f"chunk-{i:08d}" for i in range(args.chunks)]
+    text_mb = args.chunks * args.chunk_chars / 2**20
+    rows = []
+
+    legacy, heap, build_s = _heap_mb(lambda: InMemoryDocstore(dict(corpus())))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.pkl")
+        with open(path, "wb") as f:
+            pickle.dump(legacy, f)
+        disk = os.path.getsize(path) / 2**20
+    rows.append(("InMemoryDocstore", heap, disk, build_s, _lookup_us(legacy, ids, args.k, args.lookups)))
+    del legacy
+
+    compact, heap, build_s = _heap_mb(lambda: CompactDocstore.from_documents(corpus()))
+    rows.append(("Compact (in memory)", heap, None, build_s, _lookup_us(compact, ids, args.k, args.lookups)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        compact.save(tmp)
+        del compact
+        mapped, heap, load_s = _heap_mb(lambda: CompactDocstore.load(tmp))
+        rows.append(("Compact (mmap)", heap, _dir_mb(tmp), load_s, _lookup_us(mapped, ids, args.k, args.lookups)))
+        del mapped
+
+    print(f"{args.chunks} chunks, {text_mb:.1f} MB of text\n")
+    print(f"{'store':<22} {'heap MB':>9} {'x text':>7} {'disk MB':>9} {'build/load s':>13} {'k-hit us':>9}")
+    for name, heap, disk, seconds, lookup in rows:
+        disk_col = f"{disk:>9.1f}" if disk is not None else f"{'-':>9}"
+        print(
+            f"{name:<22} {heap:>9.1f} {heap / text_mb:>7.2f} {disk_col} "
+            f"{seconds:>13.2f} {lookup:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Sentences/sec per embedding backend, with cosine agreement against the
+fp32 sentence-transformers reference.
+
+    python -m backend.scripts.benchmark_embeddings --sentences 2000 --threads 4
+"""
+import argparse
+
+from backend.services.embeddings import (
+    _VALIDATION_SENTENCES,
+    benchmark_embeddings,
+    build_embeddings,
+    validate_embeddings,
+)
+
+# name -> (backend, quantize)
+BACKENDS = {
+    "torch": ("torch", False),
+    "torch-int8": ("torch", True),
+    "onnx": ("onnx", False),
+    "onnx-int8": ("onnx", True),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--sentences", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    # Chunk-sized inputs, roughly what the splitter produces
+    base = " ".join(_VALIDATION_SENTENCES)
+    sentences = [f"{i}: {base}" for i in range(args.sentences)]
+
+    reference = build_embeddings("torch", args.batch_size, args.threads, quantize=False)
+
+    print(f"{'backend':<12} {'sent/s':>10} {'min cos':>9} {'mean cos':>9}")
+    for name in args.backends.split(","):
+        backend, quantize = BACKENDS[name]
+        try:
+            embeddings = build_embeddings(backend, args.batch_size, args.threads, quantize)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+
+        rate = benchmark_embeddings(embeddings, sentences)
+        report = validate_embeddings(embeddings, reference=reference)
+        print(
+            f"{name:<12} {rate:>10.1f} {report['min_cosine']:>9.4f} {report['mean_cosine']:>9.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Tail latency of LLM calls with and without hedged requests, against a
+stand-in model whose latency is heavy-tailed (most calls fast, a few
+stalled), under a per-request deadline.
+
+    python -m backend.scripts.benchmark_hedging --requests 500 --budget-ms 3000
+
+Reports p50/p95/p99 of time to first token and total stream time, the
+number of requests that ran out of their deadline, and how many hedges
+were sent and won. A request that expired counts at the time it expired
+(for TTFT too, if no token had arrived), so dropping the slow requests
+does not flatter the percentiles.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from backend.config import settings
+from backend.services.deadlines import DeadlineExceeded, stage_stream, start_deadline
+from backend.services.hedging import hedge_delay_s, hedged_stream
+from backend.services.metrics import get_metrics, log_first_token
+from backend.services.model_router import Route
+
+
+class _StandInModel:
+    """Streams `tokens` chunks; the first is delayed by a heavy-tailed draw."""
+
+    def __init__(self, rng: random.Random, median_ms: float, stall_rate: float, stall_ms: float, tokens: int):
+        self.rng = rng
+        self.median_ms = median_ms
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.tokens = tokens
+
+    def _first_token_s(self) -> float:
+        delay = self.rng.lognormvariate(0, 0.35) * self.median_ms
+        if self.rng.random() < self.stall_rate:
+            delay += self.stall_ms
+        return delay / 1000
+
+    async def astream(self):
+        await asyncio.sleep(self._first_token_s())
+        for i in range(self.tokens):
+            if i:
+                await asyncio.sleep(0.002)
+            yield f"tok{i} "
+
+
+def _percentiles(values):
+    ordered = sorted(values)
+    if not ordered:
+        return [float("nan")] * 3
+    return [ordered[min(int(p * len(ordered)), len(ordered) - 1)] for p in (0.5, 0.95, 0.99)]
+
+
+async def _one(model: _StandInModel, route: Route, budget_ms: float):
+    start_deadline(budget_ms)
+    start = time.perf_counter()
+    ttft = None
+
+    async def open_stream():
+        opened = time.perf_counter()
+        first = True
+        async for chunk in model.astream():
+            if first:
+                first = False
+                log_first_token(route.tier, route.model, (time.perf_counter() - opened) * 1000)
+            yield chunk
+
+    chunks = stage_stream("generation", hedged_stream(open_stream, hedge_delay_s(route, first_token=True)))
+    expired = False
+    try:
+        async for _ in chunks:
+            if ttft is None:
+                ttft = (time.perf_counter() - start) * 1000
+    except DeadlineExceeded:
+        expired = True
+    total = (time.perf_counter() - start) * 1000
+    return (total if ttft is None else ttft), total, expired
+
+
+async def _run(args, hedge: bool):
+    settings.HEDGE_ENABLED = hedge
+
+    rng = random.Random(args.seed)
+    model = _StandInModel(rng, args.median_ms, args.stall_rate, args.stall_ms, args.tokens)
+    # A fresh tier per run, so each starts without latency history
+    route = Route(task="answer", tier=f"bench-{'hedged' if hedge else 'plain'}", model="stand-in", reason="benchmark")
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def limited():
+        async with sem:
+            return await _one(model, route, args.budget_ms)
+
+    # Warm up the first-token percentile the hedge delay is taken from
+    for _ in range(args.warmup):
+        await limited()
+    before = get_metrics()["hedging"]
+
+    results = await asyncio.gather(*(limited() for _ in range(args.requests)))
+    after = get_metrics()["hedging"]
+    return results, {key: after[key] - before[key] for key in after}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--median-ms", type=float, default=300.0)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--stall-ms", type=float, default=4000.0)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=3000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings.HEDGE_TASKS = ["answer"]
+
+    print(
+        f"{args.requests} requests, median first token {args.median_ms:.0f} ms, "
+        f"{args.stall_rate:.0%} stalled by {args.stall_ms:.0f} ms, budget {args.budget_ms:.0f} ms\n"
+    )
+    print(
+        f"{'hedging':<8} {'ttft p50':>9} {'p95':>7} {'p99':>7} {'total p50':>10} {'p95':>7} {'p99':>7} "
+        f"{'expired':>8} {'hedges':>7} {'won':>5}"
+    )
+    for hedge in (False, True):
+        results, hedges = asyncio.run(_run(args, hedge))
+        ttfts = [ttft for ttft, _, _ in results]
+        totals = [total for _, total, _ in results]
+        expired = sum(1 for _, _, timed_out in results if timed_out)
+        t50, t95, t99 = _percentiles(ttfts)
+        d50, d95, d99 = _percentiles(totals)
+        print(
+            f"{'on' if hedge else 'off':<8} {t50:>9.0f} {t95:>7.0f} {t99:>7.0f} {d50:>10.0f} {d95:>7.0f} {d99:>7.0f} "
+            f"{expired:>8} {hedges['sent']:>7} {hedges['won']:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
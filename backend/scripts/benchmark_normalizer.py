@@ -0,0 +1,107 @@
+"""
+Cost of answer cleanup: the previous multi-pass clean_spacing (one re.sub
+per rule) vs. the single-pass one, on whole answers, and the per-token
+cost of StreamingNormalizer on a token stream shaped like LLM output.
+
+    python -m backend.scripts.benchmark_normalizer --answers 200 --tokens 600
+
+Also checks that the streamed output, as sent to the client, equals
+clean_spacing() of the whole answer.
+"""
+import argparse
+import random
+import re
+import time
+
+from backend.utils.formatting import StreamingNormalizer, clean_spacing
+from backend.utils.sse import is_sendable
+
+_VOCAB = (
+    "insulin glucose the of and cells blood pancreas levels type diabetes "
+    "**Key Points** - ur ination Ins ulin he aling Fat igue strong ly e.g.the "
+    "dose,then . ; : \n \n\n\n"
+).split(" ")
+
+_LEGACY_FIXES = {
+    r"\bur ination\b": "urination",
+    r"\bUn int ended\b": "Unintended",
+    r"\bBl urred\b": "Blurred",
+    r"\bFat igue\b": "Fatigue",
+    r"\bIns ulin\b": "Insulin",
+    r"\bstrong ly\b": "strongly",
+    r"\bsedent ary\b": "sedentary",
+    r"\bhe aling\b": "healing",
+    r"\bslow -he aling\b": "slow-healing",
+}
+
+
+def _legacy_clean_spacing(text: str) -> str:
+    """clean_spacing as it was: one re.sub pass per rule."""
+    if not text:
+        return text
+    for pat, repl in _LEGACY_FIXES.items():
+        text = re.sub(pat, repl, text, flags=re.IGNORECASE)
+    text = re.sub(r'([.,!?;:])(?=[A-Za-z0-9])', r'\1 ', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def _tokens(n_tokens: int, rng: random.Random):
+    """LLM-like tokens: a word with its leading space, split words included."""
+    tokens = []
+    for _ in range(n_tokens):
+        word = rng.choice(_VOCAB)
+        if " " in word or len(word) < 4 or rng.random() < 0.7:
+            tokens.append(" " + word)
+        else:
+            cut = rng.randint(1, len(word) - 1)
+            tokens.extend([" " + word[:cut], word[cut:]])
+    return tokens
+
+
+def _percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    answers = [_tokens(args.tokens, rng) for _ in range(args.answers)]
+    texts = ["".join(tokens) for tokens in answers]
+    n_tokens = sum(len(tokens) for tokens in answers)
+
+    for name, clean in (("multi-pass (old)", _legacy_clean_spacing), ("single-pass", clean_spacing)):
+        start = time.perf_counter()
+        for text in texts:
+            clean(text)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} {elapsed / len(texts) * 1e6:>9.1f} us/answer")
+
+    mismatches = sum(_legacy_clean_spacing(text) != clean_spacing(text) for text in texts)
+
+    per_token = []
+    for tokens, text in zip(answers, texts):
+        normalizer = StreamingNormalizer()
+        out = []
+        for token in tokens:
+            start = time.perf_counter()
+            out.append(normalizer.feed(token))
+            per_token.append(time.perf_counter() - start)
+        out.append(normalizer.flush())
+        mismatches += "".join(filter(is_sendable, out)) != clean_spacing(text)
+
+    print(
+        f"\nstreaming          {sum(per_token) / n_tokens * 1e6:>9.2f} us/token mean, "
+        f"p99 {_percentile(per_token, 0.99) * 1e6:.2f} us ({n_tokens} tokens)"
+    )
+    print(f"mismatches vs. clean_spacing: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Peak RSS of eager vs. streaming splitting on a synthetic large document.
+
+Each mode runs in a fresh process so ru_maxrss reflects only that mode.
+Both modes hash and id every chunk the way index_documents does, and hold
+batches of 1000 chunks the way the embedding stage does.
+
+    python -m backend.scripts.benchmark_splitting --pages 3000
+"""
+import argparse
+import multiprocessing as mp
+import queue as queue_module
+import random
+import resource
+import sys
+import time
+
+from langchain.schema import Document
+
+from backend.utils.pdf_loader import iter_split_documents, split_documents
+
+_WORDS = (
+    "insulin glucose pancreas receptor hypertension artery ventricle renal "
+    "nephron filtration antibody antigen cytokine inflammation diagnosis "
+    "therapy chronic acute syndrome pathology physiology metabolism"
+).split()
+
+
+def _synthetic_pages(n_pages: int, chars_per_page: int):
+    rng = random.Random(0)
+    for page in range(n_pages):
+        words, size = [], 0
+        while size < chars_per_page:
+            w = rng.choice(_WORDS)
+            words.append(w)
+            size += len(w) + 1
+        yield Document(
+            page_content=" ".join(words),
+            metadata={"source": "reference.pdf", "page": page},
+        )
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _run(mode: str, pages: int, chars: int, queue) -> None:
+    from backend.services.retriever import _batched, _iter_new_chunks
+
+    start = time.perf_counter()
+    count = 0
+
+    if mode == "eager":
+        docs = list(_synthetic_pages(pages, chars))
+        chunks = split_documents(docs)
+        new = list(_iter_new_chunks(chunks, {}))
+        for batch in _batched(new, 1000):
+            count += len(batch)
+    else:
+        chunks = iter_split_documents(_synthetic_pages(pages, chars))
+        for batch in _batched(_iter_new_chunks(chunks, {}), 1000):
+            count += len(batch)
+
+    queue.put((mode, count, time.perf_counter() - start, _peak_rss_mb()))
+
+
+def _result(queue, proc, mode: str):
+    """Wait for a run's result, failing instead of hanging if it crashed."""
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except queue_module.Empty:
+            if not proc.is_alive() and queue.empty():
+                sys.exit(f"{mode} run failed (exit code {proc.exitcode})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=3000)
+    parser.add_argument("--chars-per-page", type=int, default=3500)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+
+    print(f"{'mode':<10} {'chunks':>8} {'seconds':>8} {'peak RSS MB':>12}")
+    for mode in ("eager", "streaming"):
+        proc = ctx.Process(target=_run, args=(mode, args.pages, args.chars_per_page, queue))
+        proc.start()
+        name, count, seconds, rss = _result(queue, proc, mode)
+        proc.join()
+        print(f"{name:<10} {count:>8} {seconds:>8.2f} {rss:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Frames/sec and server CPU per streamed answer, per-token framing vs.
+coalesced framing, using a stand-in token stream. Each frame is written
+to a real socket so the per-frame syscall cost is included.
+
+    python -m backend.scripts.benchmark_sse --tokens 1200 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+
+from backend.utils.sse import coalesce_tokens, sse_frame
+
+_VOCAB = "insulin glucose the of and cells blood pancreas - ** \n levels type".split(" ")
+
+
+async def _stand_in_llm(n_tokens: int, mean_gap_s: float, seed: int):
+    rng = random.Random(seed)
+    for _ in range(n_tokens):
+        await asyncio.sleep(rng.expovariate(1 / mean_gap_s))
+        yield rng.choice(_VOCAB) + " "
+    yield json.dumps({"type": "sources", "data": []})
+
+
+def _is_sources(chunk: str) -> bool:
+    return chunk.startswith('{"type": "sources"')
+
+
+def _drain(sock: socket.socket) -> None:
+    while sock.recv(1 << 16):
+        pass
+
+
+async def _stream_answer(args, interval_s: float, seed: int):
+    """
+    Frame one answer and write it through an asyncio transport to a real
+    socket, with write + drain per frame as an ASGI server does.
+    """
+    server, client = socket.socketpair()
+    reader = threading.Thread(target=_drain, args=(client,), daemon=True)
+    reader.start()
+    _, writer = await asyncio.open_connection(sock=server)
+
+    frames, wire_bytes = 0, 0
+    tokens = _stand_in_llm(args.tokens, args.gap_ms / 1000, seed)
+    async for piece in coalesce_tokens(tokens, interval_s, args.max_chars, _is_sources):
+        frame = sse_frame(piece)
+        writer.write(frame)
+        await writer.drain()
+        wire_bytes += len(frame)
+        frames += 1
+
+    writer.close()
+    await writer.wait_closed()
+    reader.join()
+    client.close()
+    return frames, wire_bytes
+
+
+async def _consume_only(args, seed: int):
+    """Baseline: the stand-in stream alone, no framing or writes."""
+    async for _ in _stand_in_llm(args.tokens, args.gap_ms / 1000, seed):
+        pass
+
+
+async def _timed(coros):
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    results = await asyncio.gather(*coros)
+    return results, time.process_time() - cpu0, time.perf_counter() - wall0
+
+
+async def _run(args, interval_s: float):
+    _, base_cpu, _ = await _timed(_consume_only(args, seed) for seed in range(args.concurrency))
+    results, cpu, wall = await _timed(
+        _stream_answer(args, interval_s, seed) for seed in range(args.concurrency)
+    )
+
+    frames = sum(f for f, _ in results)
+    wire_bytes = sum(b for _, b in results)
+    return {
+        "frames/answer": frames / args.concurrency,
+        "bytes/answer": wire_bytes / args.concurrency,
+        "frames/sec": frames / wall,
+        "cpu ms/answer": cpu * 1000 / args.concurrency,
+        # CPU spent on framing + writing, net of the stand-in token source
+        "net cpu ms/answer": (cpu - base_cpu) * 1000 / args.concurrency,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=1200)
+    parser.add_argument("--gap-ms", type=float, default=2.0, help="mean inter-token gap")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--interval-ms", type=float, default=40.0)
+    parser.add_argument("--max-chars", type=int, default=256)
+    args = parser.parse_args()
+
+    policies = {"per-token": 0.0, f"coalesced {args.interval_ms:g}ms": args.interval_ms / 1000}
+
+    print(
+        f"{'policy':<18} {'frames/ans':>10} {'bytes/ans':>10} {'frames/s':>10} "
+        f"{'cpu ms/ans':>11} {'net cpu ms':>11}"
+    )
+    for name, interval_s in policies.items():
+        r = asyncio.run(_run(args, interval_s))
+        print(
+            f"{name:<18} {r['frames/answer']:>10.0f} {r['bytes/answer']:>10.0f} "
+            f"{r['frames/sec']:>10.0f} {r['cpu ms/answer']:>11.2f} {r['net cpu ms/answer']:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
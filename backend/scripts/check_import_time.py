@@ -0,0 +1,97 @@
+"""
+Startup budget check: fails (exit 1) when importing the API gets slow or
+starts pulling heavy ML stacks in eagerly. Meant to run in CI.
+
+Also smoke-tests the lazily imported paths (document splitting) in a fresh
+interpreter, since a name that is only imported for type checking is not
+caught by importing the module.
+
+    python -m backend.scripts.check_import_time --budget-ms 1500
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# Must stay out of `import backend.main`; they load in the lifespan warmup
+HEAVY_MODULES = [
+    "langchain",
+    "langchain_openai",
+    "langchain_huggingface",
+    "langchain_community",
+    "faiss",
+    "transformers",
+    "torch",
+    "sentence_transformers",
+    "onnxruntime",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.main
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({
+    "ms": elapsed,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+# Runs the code behind index builds without PDFs, the embedding model or FAISS
+_SMOKE = """
+from langchain.schema import Document
+from backend.utils.pdf_loader import iter_split_documents, split_documents
+page = Document(page_content="insulin " * 400, metadata={"source": "smoke.pdf", "page": 0})
+assert list(iter_split_documents([page, page]))
+assert split_documents([page])
+"""
+
+
+def smoke_test() -> str | None:
+    """Run the lazy-import paths; return the error output if they fail."""
+    out = subprocess.run([sys.executable, "-c", _SMOKE], capture_output=True, text=True)
+    return out.stderr.strip() if out.returncode else None
+
+
+def measure(runs: int) -> dict:
+    """Best-of-N cold import in fresh interpreters."""
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE % HEAVY_MODULES],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(results, key=lambda r: r["ms"])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(f"import backend.main: {result['ms']:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if result["loaded"]:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(result['loaded'])}")
+        failed = True
+    if result["ms"] > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+
+    error = smoke_test()
+    if error:
+        print(f"FAIL: document splitting smoke test:\n{error}")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Regression check for live index updates: publishes a small shard, opens it
+the way workers do (memory-mapped, read-only), clones it and adds to and
+removes from the clone. Meant to run in CI.
+
+    python -m backend.scripts.check_live_update
+
+A clone that still views the mapped vectors makes FAISS abort the process
+(exit 134) or segfault (139) here, so any non-zero exit is a failure.
+"""
+import argparse
+import sys
+import tempfile
+
+from backend.config import settings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=50)
+    args = parser.parse_args()
+
+    from langchain_community.embeddings import FakeEmbeddings
+    from langchain_community.vectorstores import FAISS
+
+    from backend.services import index_store
+    from backend.services.retriever import _clone_vectorstore
+
+    embeddings = FakeEmbeddings(size=32)
+    texts = [f"chunk {i}" for i in range(args.chunks)]
+    ids = [f"id-{i}" for i in range(args.chunks)]
+    metadatas = [{"source": "check.pdf", "page": i} for i in range(args.chunks)]
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        settings.INDEX_DIR = index_dir
+
+        vs = FAISS.from_texts(texts, embeddings, metadatas=metadatas, ids=ids)
+        with index_store.build_lock():
+            version = index_store.publish([vs])
+        published = index_store.open_version(version, embeddings).shards[0]
+
+        clone = _clone_vectorstore(published)
+        clone.add_embeddings(
+            [("added", embeddings.embed_query("added"))],
+            metadatas=[{"source": "upload.pdf", "page": 0}],
+            ids=["added"],
+        )
+        clone.delete(ids[:5])
+
+        expected = args.chunks + 1 - 5
+        if clone.index.ntotal != expected or published.index.ntotal != args.chunks:
+            print(
+                f"FAIL: clone has {clone.index.ntotal} vectors (expected {expected}), "
+                f"published shard has {published.index.ntotal} (expected {args.chunks})"
+            )
+            return 1
+
+    print(f"ok: cloned a mapped shard, added 1 and removed 5 vectors ({expected} left)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
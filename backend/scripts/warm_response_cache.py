@@ -0,0 +1,164 @@
+"""
+Offline cache warming: answer the most frequent questions ahead of peak
+through the full get_llm_response pipeline and store them in the response
+cache, tagged with the current index version.
+
+    # from a question list (one per line)
+    python -m backend.scripts.warm_response_cache --questions top_questions.txt
+
+    # from the request log (needs LOG_QUERY_TEXT=true while serving)
+    python -m backend.scripts.warm_response_cache --log storage/query_logs.jsonl --top 200
+
+Prints a hit-rate projection: the share of logged/listed traffic that
+would have been served from the cache.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from backend.config import settings
+from backend.services.response_cache import (
+    cached_questions,
+    purge_stale,
+    put_cached_response,
+)
+from backend.utils.formatting import normalize_question
+
+
+def load_question_counts(
+    questions_path: str | None,
+    log_path: str | None,
+) -> Tuple[Counter, Dict[str, str]]:
+    """
+    Frequency of each normalized question across the given sources, and
+    its most common original phrasing (what gets sent to the pipeline:
+    the normalized form is lowercased and loses its question mark).
+    """
+    counts: Counter = Counter()
+    phrasings: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(question: str) -> None:
+        key = normalize_question(question)
+        counts[key] += 1
+        phrasings[key][question.strip()] += 1
+
+    if questions_path:
+        with open(questions_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    add(line)
+
+    if log_path:
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    question = json.loads(line).get("question")
+                except ValueError:
+                    continue
+                if question:
+                    add(question)
+
+    return counts, {key: seen.most_common(1)[0][0] for key, seen in phrasings.items()}
+
+
+def _answer(question: str) -> Tuple[str, List[Dict]]:
+    """One pipeline run in a throwaway conversation (own event loop per thread)."""
+    from backend.services.llm import get_llm_response
+    from backend.utils.memory import clear_history
+
+    conversation_id = f"cache-warm-{uuid.uuid4()}"
+    try:
+        return asyncio.run(get_llm_response(conversation_id, question))
+    finally:
+        clear_history(conversation_id)
+
+
+def warm(questions: List[str], index_version: int, concurrency: int) -> Dict[str, str]:
+    """
+    Answer and cache questions (original phrasings) with bounded
+    parallelism; returns failures.
+    """
+    failures: Dict[str, str] = {}
+
+    def run(question: str) -> None:
+        try:
+            answer, sources = _answer(question)
+        except Exception as e:
+            failures[question] = f"{type(e).__name__}: {e}"
+            return
+        put_cached_response(question, index_version, answer, sources)  # keyed normalized
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, questions))
+
+    return failures
+
+
+def project_hit_rate(counts: Counter, cached: set) -> Dict:
+    total = sum(counts.values())
+    covered = sum(n for q, n in counts.items() if q in cached)
+    ranked = [n for _, n in counts.most_common()]
+
+    return {
+        "total_queries": total,
+        "distinct_questions": len(counts),
+        "cached_questions": len(cached),
+        "projected_hit_rate": round(covered / total, 4) if total else 0.0,
+        # what caching the top-k questions would buy
+        "top_k_hit_rate": {
+            k: round(sum(ranked[:k]) / total, 4) if total else 0.0
+            for k in (10, 50, 100, 500)
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", help="file with one question per line")
+    parser.add_argument("--log", help=f"request log (e.g. {settings.QUERY_LOG_PATH})")
+    parser.add_argument("--top", type=int, default=100, help="warm the N most frequent questions")
+    parser.add_argument("--min-count", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dry-run", action="store_true", help="only print the projection")
+    args = parser.parse_args()
+
+    if not args.questions and not args.log:
+        parser.error("give --questions and/or --log")
+
+    counts, phrasings = load_question_counts(args.questions, args.log)
+
+    from backend.services.retriever import get_index_version, get_retriever
+
+    get_retriever()  # loads the published index, so the version is current
+    version = get_index_version()
+
+    already = set(cached_questions(version))
+    todo = [
+        phrasings[q] for q, n in counts.most_common(args.top)
+        if n >= args.min_count and q not in already
+    ]
+
+    print(f"index version {version}: {len(already)} cached, {len(todo)} to warm")
+
+    if not args.dry_run and todo:
+        start = time.perf_counter()
+        failures = warm(todo, version, args.concurrency)
+        print(f"warmed {len(todo) - len(failures)} in {time.perf_counter() - start:.1f}s")
+        for question, error in failures.items():
+            print(f"  failed: {question!r}: {error}")
+
+        removed = purge_stale(version)
+        if removed:
+            print(f"purged {removed} entries from older index versions")
+
+    report = project_hit_rate(counts, set(cached_questions(version)))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+
+from backend.config import settings
+from backend.services.metrics import log_admission, set_admission_gauges
+
+
+class AdmissionSlot:
+    """A held slot; release() is idempotent so streaming paths can call it twice."""
+
+    def __init__(self, controller: "AdmissionController", key: str):
+        self._controller = controller
+        self._key = key
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self._key)
+
+    async def __aenter__(self) -> "AdmissionSlot":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """
+    Caps concurrent chat generations globally and per API key.
+
+    - A key already at its cap is rejected at once with 429. Keys in
+      key_limits have their own cap instead of max_per_key.
+    - When the global cap is reached, requests wait in a bounded queue;
+      a full queue or a wait longer than timeout_s gets 503.
+    Both carry Retry-After so clients back off instead of piling on.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_per_key: int,
+        max_queue: int,
+        timeout_s: float,
+        retry_after_s: int,
+        key_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_key = max_per_key
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self.retry_after_s = retry_after_s
+        self.key_limits = dict(key_limits or {})
+
+        self._global = asyncio.Semaphore(max_concurrent)
+        self._per_key: Dict[str, int] = defaultdict(int)
+        self._in_flight = 0
+        self._waiting = 0
+
+    def _reject(self, code: int, reason: str) -> HTTPException:
+        log_admission(rejected=code)
+        return HTTPException(
+            status_code=code,
+            detail=reason,
+            headers={"Retry-After": str(self.retry_after_s)},
+        )
+
+    def _gauges(self) -> None:
+        set_admission_gauges(in_flight=self._in_flight, queue_depth=self._waiting)
+
+    async def acquire(self, api_key: Optional[str]) -> AdmissionSlot:
+        key = api_key or "anonymous"
+
+        if self._per_key[key] >= self.key_limits.get(key, self.max_per_key):
+            raise self._reject(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many concurrent requests for this API key",
+            )
+
+        if self._global.locked() and self._waiting >= self.max_queue:
+            raise self._reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Server is busy, please retry shortly",
+            )
+
+        # Reserve the per-key share before waiting so a key cannot queue past its cap
+        self._per_key[key] += 1
+        start = time.perf_counter()
+
+        if not self._global.locked():
+            await self._global.acquire()  # free slot: no wait
+        else:
+            await self._wait_in_queue(key)
+
+        self._in_flight += 1
+        self._gauges()
+        log_admission(wait_ms=(time.perf_counter() - start) * 1000)
+
+        return AdmissionSlot(self, key)
+
+    async def _wait_in_queue(self, key: str) -> None:
+        self._waiting += 1
+        self._gauges()
+        try:
+            await asyncio.wait_for(self._global.acquire(), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            self._release_key(key)
+            raise self._reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Server is busy, please retry shortly",
+            )
+        except BaseException:
+            self._release_key(key)
+            raise
+        finally:
+            self._waiting -= 1
+            self._gauges()
+
+    def _release_key(self, key: str) -> None:
+        self._per_key[key] -= 1
+        if self._per_key[key] <= 0:
+            del self._per_key[key]
+
+    def _release(self, key: str) -> None:
+        self._in_flight -= 1
+        self._release_key(key)
+        self._global.release()
+        self._gauges()
+
+
+admission = AdmissionController(
+    max_concurrent=settings.LLM_MAX_CONCURRENCY,
+    max_per_key=settings.LLM_MAX_CONCURRENCY_PER_KEY,
+    max_queue=settings.ADMISSION_QUEUE_SIZE,
+    timeout_s=settings.ADMISSION_TIMEOUT_S,
+    retry_after_s=settings.ADMISSION_RETRY_AFTER_S,
+    key_limits={settings.PUBLIC_CHAT_BUCKET: settings.PUBLIC_CHAT_MAX_CONCURRENCY},
+)
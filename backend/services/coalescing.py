@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from backend.services.admission import AdmissionSlot, admission
+from backend.services.llm import build_conversation_context, get_llm_response, stream_llm_response
+from backend.services.retriever import get_index_version
+from backend.utils.formatting import normalize_question
+from backend.utils.memory import add_message
+
+
+# -------------------
+# In-flight registries
+# -------------------
+# Only a flight's leader calls the LLM, so only it takes an admission slot;
+# the slot is held by the flight, not by any one subscriber. A stream flight
+# whose last subscriber goes away (cancel, disconnect) is cancelled.
+#
+# Keyed by (normalized question, index version, latency budget, history
+# digest). Entries live only while the leader is generating; finished
+# answers are not kept here. The budget is part of the key because it can
+# change the model, the history because the prompt includes it: the same
+# follow-up in two different conversations is two different questions.
+
+_FlightKey = Tuple[str, int, Optional[float], str]
+
+_inflight_answers: Dict[_FlightKey, asyncio.Task] = {}
+_inflight_streams: Dict[_FlightKey, "_StreamFlight"] = {}
+
+
+def _flight_key(
+    conversation_id: str,
+    user_message: str,
+    latency_budget_ms: Optional[float] = None,
+) -> _FlightKey:
+    context = build_conversation_context(conversation_id)
+    digest = hashlib.sha1(context.encode("utf-8")).hexdigest() if context else ""
+    return normalize_question(user_message), get_index_version(), latency_budget_ms, digest
+
+
+def _end_flight(registry: Dict, key: _FlightKey, slot: AdmissionSlot) -> None:
+    registry.pop(key, None)
+    slot.release()
+
+
+def _remember(conversation_id: str, user_message: str, answer: str) -> None:
+    """Record a shared answer in a follower's own conversation memory."""
+    add_message(conversation_id, "user", user_message)
+    add_message(conversation_id, "assistant", answer)
+
+
+# -------------------
+# Non-streaming
+# -------------------
+
+async def coalesced_llm_response(
+    conversation_id: str,
+    user_message: str,
+    latency_budget_ms: Optional[float] = None,
+    api_key: Optional[str] = None,
+) -> Tuple[str, List[Dict]]:
+    """
+    Same contract as get_llm_response, but concurrent duplicates of a
+    question share one pipeline run. The leader's memory is written by
+    get_llm_response itself; followers get the shared answer recorded
+    under their own conversation_id.
+
+    Raises HTTPException (429/503) if a new run is not admitted.
+    """
+    key = _flight_key(conversation_id, user_message, latency_budget_ms)
+    task = _inflight_answers.get(key)
+
+    if task is None:
+        slot = await admission.acquire(api_key)
+        task = _inflight_answers.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                get_llm_response(
+                    conversation_id=conversation_id,
+                    user_message=user_message,
+                    latency_budget_ms=latency_budget_ms,
+                )
+            )
+            _inflight_answers[key] = task
+            task.add_done_callback(lambda _t: _end_flight(_inflight_answers, key, slot))
+
+            # shield: a disconnecting leader must not cancel the followers' answer
+            return await asyncio.shield(task)
+
+        slot.release()  # another leader started while we queued: follow it
+
+    answer, sources = await asyncio.shield(task)
+    _remember(conversation_id, user_message, answer)
+    return answer, sources
+
+
+# -------------------
+# Streaming (SSE fan-out)
+# -------------------
+
+class _StreamFlight:
+    """
+    One running stream_llm_response shared by every subscriber.
+
+    Chunks are buffered as they arrive so late joiners can replay what
+    was already produced before following the live stream. Once nobody is
+    subscribed any more, the generation is cancelled: no tokens are spent
+    and no memory is written for an answer nobody receives.
+    """
+
+    def __init__(
+        self,
+        key: _FlightKey,
+        conversation_id: str,
+        user_message: str,
+        latency_budget_ms: Optional[float],
+        slot: AdmissionSlot,
+    ):
+        self.chunks: List[str] = []
+        self.final_text: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.subscribers = 0
+        self._key = key
+        self._changed = asyncio.Condition()
+        self._slot = slot
+        self._task = asyncio.create_task(self._run(conversation_id, user_message, latency_budget_ms))
+        _inflight_streams[key] = self
+        # A callback, not _run's finally: a task cancelled before it ran
+        # never executes its body
+        self._task.add_done_callback(lambda _t: self._finish())
+
+    def _finish(self) -> None:
+        self._unregister()
+        self._slot.release()
+
+    def _unregister(self) -> None:
+        if _inflight_streams.get(self._key) is self:
+            del _inflight_streams[self._key]
+
+    def unsubscribe(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done:
+            self._unregister()  # new requests start a fresh flight
+            self._task.cancel()
+
+    def _on_complete(self, text: str) -> None:
+        self.final_text = text
+
+    async def _run(self, conversation_id: str, user_message: str, latency_budget_ms: Optional[float]) -> None:
+        try:
+            async for chunk in stream_llm_response(
+                conversation_id=conversation_id,
+                user_message=user_message,
+                on_complete=self._on_complete,
+                latency_budget_ms=latency_budget_ms,
+            ):
+                async with self._changed:
+                    self.chunks.append(chunk)
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncGenerator[str, None]:
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: self.done or len(self.chunks) > sent
+                )
+                pending = self.chunks[sent:]
+                finished = self.done
+
+            for chunk in pending:
+                yield chunk
+            sent += len(pending)
+
+            if finished and sent == len(self.chunks):
+                break
+
+        if self.error is not None:
+            raise self.error
+
+
+async def open_coalesced_stream(
+    conversation_id: str,
+    user_message: str,
+    latency_budget_ms: Optional[float] = None,
+    api_key: Optional[str] = None,
+) -> "StreamSubscription":
+    """
+    Same chunks as stream_llm_response, but concurrent duplicates
+    subscribe to a single generation. Late joiners receive a replay of
+    the tokens already streamed, then the live tail.
+
+    Raises HTTPException (429/503) before anything is streamed if a new
+    generation is not admitted.
+    """
+    key = _flight_key(conversation_id, user_message, latency_budget_ms)
+    flight = _inflight_streams.get(key)
+    is_leader = False
+
+    if flight is None:
+        slot = await admission.acquire(api_key)
+        flight = _inflight_streams.get(key)
+        if flight is None:
+            is_leader = True
+            flight = _StreamFlight(key, conversation_id, user_message, latency_budget_ms, slot)
+        else:
+            slot.release()  # another leader started while we queued: follow it
+
+    return StreamSubscription(flight, conversation_id, user_message, is_leader)
+
+
+class StreamSubscription:
+    """
+    One subscriber's view of a flight. Counts as subscribed from creation
+    until exhausted or close()d, so close() it if it is never iterated.
+    """
+
+    def __init__(self, flight: _StreamFlight, conversation_id: str, user_message: str, is_leader: bool):
+        self._flight = flight
+        self._conversation_id = conversation_id
+        self._user_message = user_message
+        self._is_leader = is_leader
+        self._closed = False
+        flight.subscribers += 1
+
+    async def __aiter__(self) -> AsyncGenerator[str, None]:
+        try:
+            async for chunk in self._flight.subscribe():
+                yield chunk
+
+            final_text = self._flight.final_text
+            if not self._is_leader and final_text is not None:
+                _remember(self._conversation_id, self._user_message, final_text)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._flight.unsubscribe()
@@ -0,0 +1,254 @@
+"""
+Compact, array-backed docstore for the FAISS shards.
+
+Instead of one langchain Document (with its own metadata dict) per chunk,
+the chunk text lives in one contiguous UTF-8 blob addressed by offset and
+length arrays, and metadata is kept in small integer columns:
+
+    source -> code into an interned table of source strings
+    page   -> int32 page number (-1 when absent or not an int)
+    extra  -> code into an interned table of the remaining metadata
+              (per-file fields such as total_pages or producer)
+
+Documents are materialized only for the ids that are looked up, i.e. the
+k search hits. A published store is saved as flat files and opened
+memory-mapped, so chunk text is shared between workers through the page
+cache, like the vectors.
+
+A store opened from disk is read-only: writes on a copy-on-write clone go
+to a small overlay of Documents plus a set of tombstoned ids, and save()
+folds both back into flat columns for the next published version.
+"""
+import json
+import os
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+_BLOB_FILE = "docstore.blob"
+_COLUMNS = ("offsets", "lengths", "sources", "pages", "extras")
+_TABLES_FILE = "docstore.json"
+_NO_PAGE = -1
+
+
+class CompactDocstore(Docstore, AddableMixin):
+    def __init__(self):
+        # Base columns: growable while building, memory-mapped once loaded
+        self._blob = bytearray()
+        self._offsets = array("q")
+        self._lengths = array("i")
+        self._sources = array("I")
+        self._pages = array("i")
+        self._extras = array("I")
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+        # Interned metadata tables
+        self._source_table: List[Optional[str]] = []
+        self._source_codes: Dict[Optional[str], int] = {}
+        self._extra_table: List[Dict] = []
+        self._extra_codes: Dict[str, int] = {}
+
+        # Changes on top of a read-only base (see clone())
+        self._appendable = True
+        self._overlay: Dict[str, Document] = {}
+        self._deleted: Set[str] = set()
+
+    # -------------------
+    # Construction
+    # -------------------
+
+    @classmethod
+    def from_documents(cls, items: Iterable[Tuple[str, Document]]) -> "CompactDocstore":
+        store = cls()
+        for doc_id, doc in items:
+            store._append(doc_id, doc)
+        return store
+
+    @classmethod
+    def from_docstore(cls, docstore) -> "CompactDocstore":
+        """Convert a langchain InMemoryDocstore (older published versions)."""
+        if isinstance(docstore, cls):
+            return docstore
+        return cls.from_documents(docstore._dict.items())
+
+    def clone(self) -> "CompactDocstore":
+        """Writable copy that shares the (read-only) base columns."""
+        other = object.__new__(CompactDocstore)
+        other.__dict__.update(self.__dict__)
+        other._appendable = False
+        other._overlay = dict(self._overlay)
+        other._deleted = set(self._deleted)
+        return other
+
+    @staticmethod
+    def _intern(table: List, codes: Dict, key, value) -> int:
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(table)
+            table.append(value)
+        return code
+
+    def _append(self, doc_id: str, doc: Document) -> None:
+        extra = dict(doc.metadata or {})
+        source = extra.pop("source", None)
+        if source is not None and not isinstance(source, str):
+            extra["source"] = source  # odd types round-trip through the extra table
+            source = None
+
+        page = extra.get("page")
+        if isinstance(page, int) and not isinstance(page, bool) and 0 <= page < 2**31:
+            del extra["page"]
+        else:
+            page = _NO_PAGE
+
+        text = (doc.page_content or "").encode("utf-8")
+        self._rows[doc_id] = len(self._ids)
+        self._ids.append(doc_id)
+        self._offsets.append(len(self._blob))
+        self._lengths.append(len(text))
+        self._blob.extend(text)
+        self._sources.append(self._intern(self._source_table, self._source_codes, source, source))
+        self._pages.append(page)
+        extra_key = json.dumps(extra, sort_keys=True, default=str)
+        self._extras.append(self._intern(self._extra_table, self._extra_codes, extra_key, extra))
+
+    # -------------------
+    # Docstore interface (used by langchain's FAISS)
+    # -------------------
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._overlay or (doc_id in self._rows and doc_id not in self._deleted)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.iter_ids())
+
+    def search(self, search: str) -> Union[str, Document]:
+        doc = self._overlay.get(search)
+        if doc is not None:
+            return doc
+        row = self._rows.get(search)
+        if row is None or search in self._deleted:
+            return f"ID {search} not found."
+        return self._materialize(row)
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        overlapping = [doc_id for doc_id in texts if doc_id in self]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+
+        for doc_id, doc in texts.items():
+            if self._appendable and doc_id not in self._rows:
+                self._append(doc_id, doc)
+            else:
+                self._overlay[doc_id] = doc
+
+    def delete(self, ids: List) -> None:
+        missing = [doc_id for doc_id in ids if doc_id not in self]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+
+        for doc_id in ids:
+            if self._overlay.pop(doc_id, None) is None:
+                self._deleted.add(doc_id)
+
+    # -------------------
+    # Lookups
+    # -------------------
+
+    def _materialize(self, row: int) -> Document:
+        offset, length = int(self._offsets[row]), int(self._lengths[row])
+        text = bytes(self._blob[offset:offset + length]).decode("utf-8")
+
+        metadata = {}
+        source = self._source_table[int(self._sources[row])]
+        if source is not None:
+            metadata["source"] = source
+        page = int(self._pages[row])
+        if page != _NO_PAGE:
+            metadata["page"] = page
+        metadata.update(self._extra_table[int(self._extras[row])])
+
+        return Document(page_content=text, metadata=metadata)
+
+    def ids_for_source(self, source: str) -> List[str]:
+        """Ids of every live chunk from `source`, without materializing them."""
+        ids = []
+        code = self._source_codes.get(source)
+        if code is not None:
+            if isinstance(self._sources, array):
+                rows = [row for row, c in enumerate(self._sources) if c == code]
+            else:
+                rows = (self._sources == code).nonzero()[0].tolist()  # memory-mapped column
+            ids = [self._ids[row] for row in rows if self._ids[row] not in self._deleted]
+
+        seen = set(ids)
+        ids.extend(
+            doc_id for doc_id, doc in self._overlay.items()
+            if (doc.metadata or {}).get("source") == source and doc_id not in seen
+        )
+        return ids
+
+    def iter_ids(self) -> Iterable[str]:
+        for doc_id in self._ids:
+            if doc_id not in self._deleted:
+                yield doc_id
+        for doc_id in self._overlay:
+            if doc_id not in self._rows or doc_id in self._deleted:
+                yield doc_id
+
+    # -------------------
+    # Persistence
+    # -------------------
+
+    def save(self, path: str) -> None:
+        """Write live rows and the overlay as flat files under `path`."""
+        import numpy as np
+
+        out = CompactDocstore()
+        for doc_id in self.iter_ids():
+            out._append(doc_id, self.search(doc_id))
+
+        with open(os.path.join(path, _BLOB_FILE), "wb") as f:
+            f.write(out._blob)
+        np.save(os.path.join(path, "offsets.npy"), np.frombuffer(out._offsets, dtype=np.int64))
+        np.save(os.path.join(path, "lengths.npy"), np.frombuffer(out._lengths, dtype=np.int32))
+        np.save(os.path.join(path, "sources.npy"), np.frombuffer(out._sources, dtype=np.uint32))
+        np.save(os.path.join(path, "pages.npy"), np.frombuffer(out._pages, dtype=np.int32))
+        np.save(os.path.join(path, "extras.npy"), np.frombuffer(out._extras, dtype=np.uint32))
+
+        with open(os.path.join(path, _TABLES_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {"ids": out._ids, "sources": out._source_table, "extras": out._extra_table},
+                f,
+                ensure_ascii=False,
+                default=str,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "CompactDocstore":
+        """Open a saved store read-only, with the text and columns memory-mapped."""
+        import numpy as np
+
+        with open(os.path.join(path, _TABLES_FILE), "r", encoding="utf-8") as f:
+            tables = json.load(f)
+
+        store = cls()
+        store._appendable = False
+        store._ids = tables["ids"]
+        store._rows = {doc_id: row for row, doc_id in enumerate(store._ids)}
+        store._source_table = tables["sources"]
+        store._source_codes = {s: code for code, s in enumerate(store._source_table)}
+        store._extra_table = tables["extras"]
+
+        if not store._ids:
+            return store  # nothing to map (mmap of an empty file fails)
+
+        blob_path = os.path.join(path, _BLOB_FILE)
+        if os.path.getsize(blob_path):
+            store._blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        for name in _COLUMNS:
+            setattr(store, f"_{name}", np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        return store
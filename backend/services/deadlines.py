@@ -0,0 +1,95 @@
+"""
+Per-request deadlines.
+
+A chat turn gets one absolute deadline (REQUEST_DEADLINE_MS, or the
+caller's latency_budget_ms if tighter), held in a ContextVar so it follows
+the request into the tasks it spawns. Each pipeline stage (classifier,
+retrieval, generation, ...) may use a share of whatever budget is left when
+it starts (DEADLINE_STAGE_SHARES), so a stuck upstream call is cut off
+instead of holding the request and its admission slot indefinitely.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Optional, TypeVar
+
+from backend.config import settings
+
+T = TypeVar("T")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of its latency budget during `stage`."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+def start_deadline(latency_budget_ms: Optional[float] = None) -> Optional[float]:
+    """Set the current request's deadline (monotonic seconds) and return it."""
+    budgets = [b for b in (settings.REQUEST_DEADLINE_MS, latency_budget_ms) if b and b > 0]
+    deadline = time.monotonic() + min(budgets) / 1000 if budgets else None
+    _deadline.set(deadline)
+    return deadline
+
+
+def remaining_s() -> Optional[float]:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def stage_timeout(stage: str) -> Optional[float]:
+    """Seconds `stage` may take: its share of the remaining budget."""
+    remaining = remaining_s()
+    if remaining is None:
+        return None
+    if remaining <= 0:
+        raise DeadlineExceeded(stage)
+    return remaining * settings.DEADLINE_STAGE_SHARES.get(stage, 1.0)
+
+
+async def run_stage(stage: str, awaitable: Awaitable[T]) -> T:
+    """Await one stage within its share of the deadline (cancelled on expiry)."""
+    try:
+        timeout = stage_timeout(stage)
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()  # never started; avoid "never awaited" warnings
+        raise
+
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(stage) from None
+
+
+async def stage_stream(stage: str, chunks: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Relay a stream until the stage's share of the deadline runs out."""
+    timeout = stage_timeout(stage)
+    stage_end = asyncio.get_running_loop().time() + timeout if timeout is not None else None
+    iterator = chunks.__aiter__()
+
+    # One timeout for the whole stream (no task per chunk). It is only armed
+    # while waiting for the next chunk: expiring while the consumer holds a
+    # chunk would cancel the consumer instead of this wait.
+    try:
+        async with asyncio.timeout(None) as window:
+            while True:
+                window.reschedule(stage_end)
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                window.reschedule(None)
+                yield chunk
+    except TimeoutError:
+        raise DeadlineExceeded(stage) from None
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -1,13 +1,22 @@
 from __future__ import annotations
-from typing import List
+from functools import lru_cache
+from typing import Dict, List
 import os
+import time
+
+from typing import TYPE_CHECKING
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.schema import Document
-from langchain_huggingface import HuggingFaceEmbeddings
 from backend.config import settings
 
+# Heavy ML stacks are imported inside the functions that need them, so
+# importing this module (and the API) stays cheap.
+if TYPE_CHECKING:
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_community.vectorstores import FAISS
+    from langchain.schema import Document
+    from langchain_core.embeddings import Embeddings
+    from langchain_huggingface import HuggingFaceEmbeddings
+
 
 # Directory where FAISS index is stored
 INDEX_DIR = os.path.join("backend", "data", "faiss_index")
@@ -17,6 +26,8 @@ def get_embeddings() -> OpenAIEmbeddings:
     """
     Initialize OpenAI embeddings.
     """
+    from langchain_openai import OpenAIEmbeddings
+
     return OpenAIEmbeddings(
         openai_api_key=settings.OPENAI_API_KEY
     )
@@ -26,6 +37,8 @@ def load_faiss_index() -> FAISS | None:
     """
     Load existing FAISS index if it exists.
     """
+    from langchain_community.vectorstores import FAISS
+
     if os.path.exists(INDEX_DIR):
         embeddings = get_embeddings()
         return FAISS.load_local(
@@ -48,6 +61,8 @@ def create_or_update_faiss(docs: List[Document]) -> FAISS:
     """
     Create a new FAISS index or update the existing one.
     """
+    from langchain_community.vectorstores import FAISS
+
     embeddings = get_embeddings()
     existing_index = load_faiss_index()
 
@@ -60,7 +75,169 @@ def create_or_update_faiss(docs: List[Document]) -> FAISS:
     save_faiss_index(vectorstore)
     return vectorstore
 
-def get_hf_embeddings() -> "HuggingFaceEmbeddings":
-    return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
+# -------------------
+# Local embedding backends
+# -------------------
+
+_VALIDATION_SENTENCES = [
+    "Insulin regulates blood glucose by promoting uptake into cells.",
+    "Hypertension is a major risk factor for stroke and heart failure.",
+    "The mitral valve separates the left atrium from the left ventricle.",
+    "Symptoms of type 2 diabetes include thirst, fatigue and blurred vision.",
+    "Antibiotics are ineffective against viral infections such as influenza.",
+    "Chronic kidney disease is staged by estimated glomerular filtration rate.",
+]
+
+
+def _build_torch_embeddings(
+    batch_size: int,
+    threads: int | None,
+    quantize: bool,
+) -> "HuggingFaceEmbeddings":
+    """sentence-transformers on CPU with explicit batching and threading."""
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=settings.EMBEDDING_MODEL,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": batch_size},
+    )
+
+    if quantize:
+        # int8 weights for every Linear layer; activations stay fp32
+        torch.quantization.quantize_dynamic(
+            embeddings._client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+
+    return embeddings
+
+
+def export_onnx(out_dir: str = settings.EMBEDDING_ONNX_DIR) -> str:
+    """
+    One-off export of EMBEDDING_MODEL to ONNX + tokenizer.json so the
+    onnx backend can run without downloading anything at serve time.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(settings.EMBEDDING_MODEL)
+    model = AutoModel.from_pretrained(settings.EMBEDDING_MODEL).eval()
+    tokenizer.save_pretrained(out_dir)
+
+    sample = tokenizer(["export"], return_tensors="pt")
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        os.path.join(out_dir, "model.onnx"),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            name: {0: "batch", 1: "sequence"}
+            for name in ("input_ids", "attention_mask", "token_type_ids", "last_hidden_state")
+        },
+        opset_version=17,
+    )
+    return out_dir
+
+
+def build_embeddings(
+    backend: str | None = None,
+    batch_size: int | None = None,
+    threads: int | None = None,
+    quantize: bool | None = None,
+) -> Embeddings:
+    """
+    Construct an embedding backend; arguments default to the EMBEDDING_* settings.
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    threads = threads if threads is not None else settings.EMBEDDING_THREADS
+    quantize = settings.EMBEDDING_QUANTIZE if quantize is None else quantize
+
+    if backend == "torch":
+        return _build_torch_embeddings(batch_size, threads, quantize)
+    if backend == "onnx":
+        from backend.services.onnx_embeddings import OnnxEmbeddings
+
+        return OnnxEmbeddings(
+            settings.EMBEDDING_ONNX_DIR,
+            batch_size=batch_size,
+            threads=threads,
+            quantize=quantize,
+        )
+
+    raise ValueError(f"Unknown embedding backend: {backend!r}")
+
+
+def validate_embeddings(
+    candidate: Embeddings,
+    reference: Embeddings | None = None,
+    sentences: List[str] | None = None,
+    min_cosine: float = settings.EMBEDDING_MIN_COSINE,
+) -> Dict:
+    """
+    Compare a backend against the fp32 sentence-transformers reference.
+
+    Returns min/mean cosine similarity over the sample sentences and
+    whether every pair clears min_cosine.
+    """
+    import numpy as np
+
+    sentences = sentences or _VALIDATION_SENTENCES
+    reference = reference or _build_torch_embeddings(
+        settings.EMBEDDING_BATCH_SIZE, settings.EMBEDDING_THREADS, quantize=False
     )
+
+    a = np.asarray(candidate.embed_documents(sentences), dtype=np.float32)
+    b = np.asarray(reference.embed_documents(sentences), dtype=np.float32)
+    cosines = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+    return {
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "passed": bool(cosines.min() >= min_cosine),
+    }
+
+
+def benchmark_embeddings(
+    embeddings: Embeddings,
+    sentences: List[str],
+    repeats: int = 3,
+) -> float:
+    """Best-of-N throughput in sentences/sec for embed_documents."""
+    embeddings.embed_documents(sentences[:8])  # warm up sessions / kernels
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embeddings.embed_documents(sentences)
+        best = min(best, time.perf_counter() - start)
+
+    return len(sentences) / best
+
+
+@lru_cache(maxsize=1)
+def get_hf_embeddings() -> Embeddings:
+    """
+    Process-wide embedding backend selected by the EMBEDDING_* settings.
+    Cached so the model is loaded once per worker.
+    """
+    embeddings = build_embeddings()
+
+    if settings.EMBEDDING_VALIDATE and (
+        settings.EMBEDDING_BACKEND != "torch" or settings.EMBEDDING_QUANTIZE
+    ):
+        report = validate_embeddings(embeddings)
+        if not report["passed"]:
+            raise ValueError(
+                f"Embedding backend {settings.EMBEDDING_BACKEND!r} disagrees with the "
+                f"reference (min cosine {report['min_cosine']:.4f})"
+            )
+
+    return embeddings
@@ -0,0 +1,136 @@
+"""
+Hedged LLM requests for tail-latency control.
+
+If a call has not answered (or a stream has not produced its first token)
+within a delay taken from the tier's recent latency percentile, a duplicate
+is sent and whichever responds first is used. The other one is cancelled,
+which closes its upstream HTTP request. Hedging is off unless
+HEDGE_ENABLED is set, and only applies to the tasks in HEDGE_TASKS.
+"""
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from backend.config import settings
+from backend.services.metrics import first_token_latency_ms, log_hedge, tier_latency_ms
+from backend.services.model_router import Route
+
+T = TypeVar("T")
+
+
+def hedge_delay_s(route: Route, first_token: bool = False) -> Optional[float]:
+    """Delay before hedging a call on `route`, or None if it is not hedged."""
+    if not settings.HEDGE_ENABLED or route.task not in settings.HEDGE_TASKS:
+        return None
+
+    percentile = settings.HEDGE_PERCENTILE
+    observed = (
+        first_token_latency_ms(route.tier, percentile)
+        if first_token
+        else tier_latency_ms(route.tier, percentile)
+    )
+    delay_ms = observed if observed is not None else settings.HEDGE_DEFAULT_DELAY_MS
+    return max(delay_ms, settings.HEDGE_MIN_DELAY_MS) / 1000
+
+
+async def _cancel(*tasks: asyncio.Future) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def hedged_call(call: Callable[[], Awaitable[T]], delay_s: Optional[float]) -> T:
+    """Await call(); after delay_s, race a second call() against the first."""
+    if delay_s is None:
+        return await call()
+
+    first = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({first}, timeout=delay_s)
+    if done:
+        return first.result()
+
+    second = asyncio.ensure_future(call())
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    log_hedge(won=task is second)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        await _cancel(*[t for t in (first, second) if not t.done()])
+
+
+async def hedged_stream(
+    open_stream: Callable[[], AsyncIterator[T]],
+    delay_s: Optional[float],
+) -> AsyncIterator[T]:
+    """
+    Relay open_stream(); if its first chunk is later than delay_s, open a
+    second stream and relay whichever produces a first chunk first. Nothing
+    is relayed before that, so the client never sees both.
+    """
+    if delay_s is None:
+        async for chunk in open_stream():
+            yield chunk
+        return
+
+    streams = [open_stream()]
+    firsts = {asyncio.ensure_future(streams[0].__anext__()): streams[0]}
+    winner, first_chunk, error = None, None, None
+    exhausted = False
+
+    try:
+        timeout = delay_s
+        while winner is None and firsts:
+            done, _ = await asyncio.wait(firsts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # First token is late: send the hedge and race both
+                stream = open_stream()
+                streams.append(stream)
+                firsts[asyncio.ensure_future(stream.__anext__())] = stream
+                timeout = None
+                continue
+
+            for task in done:
+                stream = firsts.pop(task)
+                try:
+                    first_chunk = task.result()
+                except StopAsyncIteration:
+                    exhausted = True
+                except Exception as e:
+                    error = e
+                    continue
+                winner = stream
+                break
+
+            if winner is None and not firsts and len(streams) == 1:
+                # The only request failed before the hedge went out: retry once now
+                stream = open_stream()
+                streams.append(stream)
+                firsts[asyncio.ensure_future(stream.__anext__())] = stream
+                timeout = None
+    finally:
+        await _cancel(*firsts)
+        for stream in streams:
+            if stream is not winner:
+                await stream.aclose()
+
+    if winner is None:
+        raise error
+
+    if len(streams) > 1:
+        log_hedge(won=winner is streams[-1])
+    if exhausted:
+        return
+
+    try:
+        yield first_chunk
+        async for chunk in winner:
+            yield chunk
+    finally:
+        await winner.aclose()
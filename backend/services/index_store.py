@@ -0,0 +1,239 @@
+"""
+On-disk, versioned FAISS index shared by every uvicorn worker.
+
+Layout under settings.INDEX_DIR:
+
+    CURRENT          -> {"version": 3}   (atomically replaced on publish)
+    v000003/
+        shards.json  -> {"shards": 4, "corpus": {path: {sha256, size, mtime_ns}}}
+        shard-000/   -> index.faiss, index.pkl (id map) and the compact
+                        docstore files (absent for an empty shard)
+        ...
+    .build.lock      -> flock held while one worker builds/publishes
+
+Older single-index versions (index.faiss + index.pkl directly in the
+version dir) open as one shard.
+
+The vectors are opened memory-mapped and read-only, so N workers share
+one copy through the page cache instead of each holding its own. Shards
+that did not change are hard-linked from the previous version, so
+republishing after a one-document update only writes that shard.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from backend.config import settings
+
+if TYPE_CHECKING:
+    from backend.services.sharded_index import ShardedIndex
+
+
+_CURRENT_FILE = "CURRENT"
+_SHARDS_FILE = "shards.json"
+_LOCK_FILE = ".build.lock"
+_KEEP_VERSIONS = 2  # previous version stays on disk while workers switch over
+
+
+def _version_dir(version: int) -> str:
+    return os.path.join(settings.INDEX_DIR, f"v{version:06d}")
+
+
+def _shard_dir(version_dir: str, shard: int) -> str:
+    if os.path.exists(os.path.join(version_dir, "index.faiss")):
+        return version_dir  # single-index layout
+    return os.path.join(version_dir, f"shard-{shard:03d}")
+
+
+def _read_shards_file(version: int) -> Dict:
+    try:
+        with open(os.path.join(_version_dir(version), _SHARDS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def read_shard_count(version: int) -> int:
+    try:
+        return int(_read_shards_file(version)["shards"])
+    except (KeyError, TypeError, ValueError):
+        return 1
+
+
+def read_corpus(version: int) -> Optional[Dict[str, Dict]]:
+    """Fingerprints of the PDFs a version was built from, or None if not recorded."""
+    return _read_shards_file(version).get("corpus")
+
+
+# -------------------
+# Version pointer
+# -------------------
+
+def read_current_version() -> Optional[int]:
+    """Return the published index version, or None if nothing is published."""
+    path = os.path.join(settings.INDEX_DIR, _CURRENT_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(json.load(f)["version"])
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def _write_current_version(version: int) -> None:
+    fd, tmp = tempfile.mkstemp(dir=settings.INDEX_DIR, prefix=".current-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"version": version}, f)
+    os.replace(tmp, os.path.join(settings.INDEX_DIR, _CURRENT_FILE))
+
+
+@contextmanager
+def build_lock() -> Iterator[None]:
+    """Cross-process lock so only one worker builds or publishes at a time."""
+    os.makedirs(settings.INDEX_DIR, exist_ok=True)
+    with open(os.path.join(settings.INDEX_DIR, _LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+# -------------------
+# Publish / Open
+# -------------------
+
+def publish(
+    shards: Sequence,
+    unchanged: Iterable[int] = (),
+    corpus: Optional[Dict[str, Dict]] = None,
+) -> int:
+    """
+    Write one FAISS vectorstore per shard (None = empty) as the next version
+    and point CURRENT at it. Shards listed in `unchanged` are hard-linked
+    from the current version instead of being written. `corpus` records the
+    source files' fingerprints; None carries over the current version's.
+    Caller must hold build_lock().
+    """
+    import faiss
+    from backend.services.compact_docstore import CompactDocstore
+
+    previous = read_current_version()
+    version = (previous or 0) + 1
+    staging = tempfile.mkdtemp(dir=settings.INDEX_DIR, prefix=".staging-")
+    unchanged = set(unchanged) if previous is not None else set()
+    if corpus is None and previous is not None:
+        corpus = read_corpus(previous)
+
+    for shard, vs in enumerate(shards):
+        target = os.path.join(staging, f"shard-{shard:03d}")
+
+        if shard in unchanged:
+            source = _shard_dir(_version_dir(previous), shard)
+            if os.path.exists(os.path.join(source, "index.faiss")):
+                os.makedirs(target)
+                for name in os.listdir(source):
+                    if os.path.isfile(os.path.join(source, name)):
+                        os.link(os.path.join(source, name), os.path.join(target, name))
+            continue
+
+        if vs is None or vs.index.ntotal == 0:
+            continue
+
+        os.makedirs(target)
+        faiss.write_index(vs.index, os.path.join(target, "index.faiss"))
+        CompactDocstore.from_docstore(vs.docstore).save(target)
+        with open(os.path.join(target, "index.pkl"), "wb") as f:
+            pickle.dump((None, vs.index_to_docstore_id), f)
+
+    with open(os.path.join(staging, _SHARDS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"shards": len(shards), "corpus": corpus}, f, ensure_ascii=False)
+
+    os.replace(staging, _version_dir(version))
+    _write_current_version(version)
+    _prune(version)
+
+    return version
+
+
+def _prune(current: int) -> None:
+    """Remove versions older than the last _KEEP_VERSIONS (open mmaps stay valid)."""
+    for name in os.listdir(settings.INDEX_DIR):
+        if not name.startswith("v"):
+            continue
+        try:
+            version = int(name[1:])
+        except ValueError:
+            continue
+        if version <= current - _KEEP_VERSIONS:
+            shutil.rmtree(os.path.join(settings.INDEX_DIR, name), ignore_errors=True)
+
+
+def _file_key(path: str):
+    # Hard links keep inode, size and mtime, so an unchanged shard keeps its key
+    st = os.stat(path)
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def open_version(version: int, embeddings, previous: Optional[ShardedIndex] = None) -> ShardedIndex:
+    """
+    Open a published version read-only. Shards whose files are the same as
+    in `previous` (hard-linked, unchanged) are reused instead of reopened.
+    """
+    from backend.services.sharded_index import ShardedIndex
+
+    path = _version_dir(version)
+    shards: List = []
+    keys: List = []
+
+    for shard in range(read_shard_count(version)):
+        shard_path = _shard_dir(path, shard)
+        index_file = os.path.join(shard_path, "index.faiss")
+        if not os.path.exists(index_file):
+            shards.append(None)
+            keys.append(None)
+            continue
+
+        key = _file_key(index_file)
+        if previous is not None and shard < previous.num_shards and previous.keys[shard] == key:
+            shards.append(previous.shards[shard])
+        else:
+            shards.append(_open_shard(shard_path, embeddings))
+        keys.append(key)
+
+    return ShardedIndex(shards, embeddings, keys)
+
+
+def _open_shard(path: str, embeddings):
+    """
+    Open one shard. Vectors and the compact docstore are memory-mapped
+    where the installed FAISS supports it; only the id map is unpickled.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from backend.services.compact_docstore import CompactDocstore
+
+    # IO_FLAG_MMAP_IFC (newer FAISS) maps flat codes zero-copy as well
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    index = faiss.read_index(os.path.join(path, "index.faiss"), flags)
+
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    if docstore is None:
+        docstore = CompactDocstore.load(path)
+    else:
+        docstore = CompactDocstore.from_docstore(docstore)  # pickled InMemoryDocstore
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
@@ -1,20 +1,36 @@
-from typing import AsyncGenerator, Tuple, List, Dict
+from __future__ import annotations
+
+from typing import Any, AsyncGenerator, Callable, Optional, Tuple, List, Dict
 import os
-import asyncio
 import json
 import re
-
-from langchain_openai import ChatOpenAI
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.callbacks.streaming_aiter import AsyncIteratorCallbackHandler
+import time
 
 from backend.prompts.base_prompt import system_prompt
 from backend.services.retriever import get_retriever
-from backend.config import settings
+from backend.services.profiling import span
+from backend.services.model_router import Route, chat_model, route_task, track
+from backend.services.deadlines import DeadlineExceeded, run_stage, stage_stream
+from backend.services.hedging import hedge_delay_s, hedged_call, hedged_stream
+from backend.services.metrics import log_first_token
 from backend.utils.memory import get_history, add_message
-from backend.utils.formatting import clean_spacing
+from backend.utils.formatting import StreamingNormalizer, clean_spacing
+
+# langchain / OpenAI are imported inside the functions below (and in
+# model_router) so that importing the API stays fast; the lifespan warmup
+# loads them early.
+
+
+async def _invoke(route: Route, runnable: Any, inputs: Any, stage: str) -> Any:
+    """
+    One model call: hedged if configured, tracked under its tier, and
+    cancelled if it outlives the stage's share of the request deadline.
+    """
+    async def call():
+        with track(route):
+            return await runnable.ainvoke(inputs)
+
+    return await run_stage(stage, hedged_call(call, hedge_delay_s(route)))
 
 
 def build_conversation_context(conversation_id: str) -> str:
@@ -33,7 +49,7 @@ def looks_like_markdown(text: str) -> bool:
     return False
 
 
-async def ensure_markdown(text: str, llm: ChatOpenAI) -> str:
+async def ensure_markdown(text: str) -> str:
     if looks_like_markdown(text):
         return text
 
@@ -55,7 +71,12 @@ ORIGINAL_REPLY:
 {text}
 """
 
-    resp = llm.invoke([("human", reform_prompt)])
+    route = route_task("reformat")
+    llm = chat_model(route, temperature=0.4)
+    try:
+        resp = await _invoke(route, llm, [("human", reform_prompt)], "reformat")
+    except DeadlineExceeded:
+        return text  # cosmetic step: out of budget, keep the answer as is
     return resp.content.strip()
 
 
@@ -79,70 +100,28 @@ def is_bad_answer(text: str) -> bool:
     return any(b in text.lower() for b in bad_keywords)
 
 
-async def get_llm_response(conversation_id: str, user_message: str) -> Tuple[str, List[Dict]]:
-    retriever = get_retriever()
-
-    llm = ChatOpenAI(
-        temperature=0.4,
-        model="gpt-4o",
-        openai_api_key=settings.OPENAI_API_KEY
-    )
-
-    conversation_context = build_conversation_context(conversation_id)
-
-    # 🔍 MEDICAL-ONLY CLASSIFIER (non-streaming version)
-    classifier_prompt = f"""
+def _classifier_prompt(user_message: str) -> str:
+    return f"""
     Is the following question medical-related (health, disease, physiology,
     diagnosis, pathology, treatment)? Reply 'yes' or 'no' only.
 
     Question: "{user_message}"
     """
 
-    classifier_llm = ChatOpenAI(
-        temperature=0,
-        model="gpt-4o",
-        openai_api_key=settings.OPENAI_API_KEY
-    )
-
-    is_medical = classifier_llm.invoke([("human", classifier_prompt)]).content.strip().lower()
-
-    if "no" in is_medical:
-        answer = "⚠️ I can only answer medical and health-related questions."
-        add_message(conversation_id, "assistant", answer)
-        return answer, []
-
-    # Continue as normal...
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", f"{conversation_context}{{input}}")
-    ])
-
-    qa_chain = create_stuff_documents_chain(llm, prompt)
-    rag_chain = create_retrieval_chain(retriever, qa_chain)
 
-    response = rag_chain.invoke({"input": user_message})
-    context_docs = response.get("context", [])
+async def _is_medical(user_message: str) -> bool:
+    route = route_task("classifier")
+    classifier_llm = chat_model(route, temperature=0)
 
-    answer = clean_spacing(str(response.get("answer", "")).strip())
+    with span("classifier"):
+        reply = await _invoke(
+            route, classifier_llm, [("human", _classifier_prompt(user_message))], "classifier"
+        )
 
-    if not context_docs:
-        fallback_msg = llm.invoke([
-            ("system", "You are a highly knowledgeable medical tutor. Explain clearly in structured bullets."),
-            ("human", user_message)
-        ])
-        answer = clean_spacing(fallback_msg.content.strip())
+    return "no" not in reply.content.strip().lower()
 
-    if is_bad_answer(answer):
-        fallback_msg = llm.invoke([
-            ("system", "You are a highly knowledgeable medical tutor. Answer with clear bullet points."),
-            ("human", user_message)
-        ])
-        answer = clean_spacing(fallback_msg.content.strip())
 
-    add_message(conversation_id, "user", user_message)
-    add_message(conversation_id, "assistant", answer)
-
-    # Extract sources
+def _extract_sources(context_docs: List) -> List[Dict]:
     seen = set()
     sources = []
     for doc in context_docs:
@@ -165,11 +144,87 @@ async def get_llm_response(conversation_id: str, user_message: str) -> Tuple[str
             "paragraph": paragraph,
             "url": file_url
         })
+    return sources
+
+
+async def _fallback_answer(
+    user_message: str,
+    instruction: str,
+    context_docs: List,
+    latency_budget_ms: Optional[float],
+) -> str:
+    route = route_task("fallback", user_message, context_docs, latency_budget_ms)
+    llm = chat_model(route, temperature=0.4)
+
+    with span("fallback"):
+        fallback_msg = await _invoke(route, llm, [
+            ("system", f"You are a highly knowledgeable medical tutor. {instruction}"),
+            ("human", user_message)
+        ], "fallback")
+    return clean_spacing(fallback_msg.content.strip())
+
+
+async def get_llm_response(
+    conversation_id: str,
+    user_message: str,
+    latency_budget_ms: Optional[float] = None,
+) -> Tuple[str, List[Dict]]:
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.prompts import ChatPromptTemplate
+
+    with span("load_retriever"):
+        retriever = get_retriever()
+
+    conversation_context = build_conversation_context(conversation_id)
+
+    # 🔍 MEDICAL-ONLY CLASSIFIER (non-streaming version)
+    if not await _is_medical(user_message):
+        answer = "⚠️ I can only answer medical and health-related questions."
+        add_message(conversation_id, "assistant", answer)
+        return answer, []
+
+    # Retrieve explicitly: the scores feed the model choice
+    with span("retrieval"):
+        context_docs = await run_stage("retrieval", retriever.ainvoke(user_message))
+
+    route = route_task("answer", user_message, context_docs, latency_budget_ms)
+    llm = chat_model(route, temperature=0.4)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", f"{conversation_context}{{input}}")
+    ])
+
+    qa_chain = create_stuff_documents_chain(llm, prompt)
+
+    with span("generation"):
+        response = await _invoke(
+            route, qa_chain, {"input": user_message, "context": context_docs}, "generation"
+        )
+
+    answer = clean_spacing(str(response or "").strip())
+
+    if not context_docs:
+        answer = await _fallback_answer(
+            user_message, "Explain clearly in structured bullets.", context_docs, latency_budget_ms
+        )
+
+    if is_bad_answer(answer):
+        answer = await _fallback_answer(
+            user_message, "Answer with clear bullet points.", context_docs, latency_budget_ms
+        )
+
+    add_message(conversation_id, "user", user_message)
+    add_message(conversation_id, "assistant", answer)
+
+    # Extract sources
+    sources = _extract_sources(context_docs)
 
     if not sources:
         answer += "\n\n_(This explanation is based on general medical knowledge.)_"
 
-    answer = await ensure_markdown(answer, llm)
+    with span("reformat"):
+        answer = await ensure_markdown(answer)
 
     return answer, sources
 
@@ -178,42 +233,39 @@ async def get_llm_response(conversation_id: str, user_message: str) -> Tuple[str
 async def stream_llm_response(
     conversation_id: str,
     user_message: str,
+    on_complete: Optional[Callable[[str], None]] = None,
+    latency_budget_ms: Optional[float] = None,
 ) -> AsyncGenerator[str, None]:
+    """
+    Stream the answer token-by-token, then a final JSON "sources" chunk.
 
-    retriever = get_retriever()
-    callback = AsyncIteratorCallbackHandler()
+    Tokens are cleaned as they stream, so the streamed text is exactly the
+    answer stored in memory; there is no Markdown reformat afterwards.
+    on_complete, if given, receives that answer (used by request
+    coalescing to fan it out).
+    """
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.prompts import ChatPromptTemplate
 
-    llm = ChatOpenAI(
-        temperature=0.4,
-        model="gpt-4o",
-        streaming=True,
-        callbacks=[callback],
-        openai_api_key=settings.OPENAI_API_KEY,
-    )
+    with span("load_retriever"):
+        retriever = get_retriever()
 
     conversation_context = build_conversation_context(conversation_id)
 
      # 🔍 MEDICAL-ONLY CLASSIFIER (STREAMING version)
-    classifier_llm = ChatOpenAI(
-        temperature=0,
-        model="gpt-4o",
-        openai_api_key=settings.OPENAI_API_KEY
-    )
-
-    classifier_prompt = f"""
-    Is the following question medical-related (health, disease, physiology,
-    diagnosis, pathology, treatment)? Reply 'yes' or 'no' only.
-
-    Question: "{user_message}"
-    """
-
-    is_medical = classifier_llm.invoke([("human", classifier_prompt)]).content.strip().lower()
-
-    if "no" in is_medical:
+    if not await _is_medical(user_message):
         yield "⚠️ I can only answer medical and health-related questions."
         add_message(conversation_id, "assistant", "⚠️ I can only answer medical questions.")
+        if on_complete:
+            on_complete("⚠️ I can only answer medical questions.")
         return
 
+    # Retrieve explicitly: the scores feed the model choice
+    with span("retrieval"):
+        context_docs = await run_stage("retrieval", retriever.ainvoke(user_message))
+
+    route = route_task("answer", user_message, context_docs, latency_budget_ms)
+    llm = chat_model(route, temperature=0.4, streaming=True)
 
     prompt = ChatPromptTemplate.from_messages([
         ("system", system_prompt),
@@ -221,75 +273,52 @@ async def stream_llm_response(
     ])
 
     qa_chain = create_stuff_documents_chain(llm, prompt)
-    rag_chain = create_retrieval_chain(retriever, qa_chain)
 
     add_message(conversation_id, "user", user_message)
 
-    response_holder: Dict[str, Dict] = {}
+    async def open_stream():
+        # One streamed generation; the hedge opens a second one if needed
+        start = time.perf_counter()
+        first = True
+        with track(route):
+            async for token in qa_chain.astream({"input": user_message, "context": context_docs}):
+                if first:
+                    first = False
+                    log_first_token(route.tier, route.model, (time.perf_counter() - start) * 1000)
+                yield token
+
+    # Clients get the same cleaned text that is stored, as it streams
+    normalizer = StreamingNormalizer()
+    full_text = ""
+    tokens = stage_stream("generation", hedged_stream(open_stream, hedge_delay_s(route, first_token=True)))
 
-    async def run_chain():
+    # Wall time from chain start to the last token (includes the time the
+    # client takes to consume the stream)
+    with span("generation"):
         try:
-            resp = await rag_chain.ainvoke({"input": user_message})
-            response_holder["resp"] = resp
+            async for token in tokens:
+                text = normalizer.feed(str(token))
+                if text:
+                    full_text += text
+                    yield text
+        except DeadlineExceeded:
+            if not full_text:
+                raise
+            print("⚠️ Deadline reached mid-stream; keeping the partial answer")
         except Exception as e:
             print("⚠️ Streaming chain error:", e)
-        finally:
-            if hasattr(callback, "aiter_queue"):
-                await callback.aiter_queue.put(None)
-            elif hasattr(callback, "done") and hasattr(callback.done, "set"):
-                callback.done.set()
-
-    asyncio.create_task(run_chain())
 
-    full_text = ""
-
-    async for token in callback.aiter():
-        text = str(token)
-        if isinstance(text, str):
-            full_text += text
+    text = normalizer.flush()
+    if text:
+        full_text += text
         yield text
 
-    full_text = clean_spacing(full_text.strip())
-    full_text = await ensure_markdown(full_text, llm)
-
     add_message(conversation_id, "assistant", full_text)
-
-    sources: List[Dict] = []
+    if on_complete:
+        on_complete(full_text)
 
     try:
-        resp = response_holder.get("resp", {}) or {}
-        context_docs = resp.get("context", [])
-
-        seen = set()
-
-        for doc in context_docs:
-            if not hasattr(doc, "metadata"):
-                continue
-
-            title = doc.metadata.get("source", "Unknown Source")
-            page = doc.metadata.get("page", "N/A")
-            key = (title, page)
-
-            if key in seen:
-                continue
-
-            seen.add(key)
-
-            paragraph = (getattr(doc, "page_content", "") or "").strip()
-
-            file_url = (
-                title
-                if isinstance(title, str) and title.startswith("http")
-                else f"/files/{os.path.basename(str(title))}"
-            )
-
-            sources.append({
-                "title": title,
-                "page": page,
-                "paragraph": paragraph,
-                "url": file_url,
-            })
-
+        sources = _extract_sources(context_docs)
     except Exception:
         sources = []
 
@@ -1,14 +1,192 @@
+import atexit
+import json
+import os
+import queue
+import resource
+import sys
+import threading
 import time
+from collections import deque
+from datetime import datetime, timezone
+
+from backend.config import settings
 
 _METRICS = {
     "queries": 0,
     "total_latency_ms": 0.0,
+    "response_cache_hits": 0,
+    "retrieval_cache_hits": 0,
+    "retrieval_cache_misses": 0,
+    "retrieval_cache_entries": 0,
+    "index_version": None,
+    "index_rss_before_mb": None,
+    "index_rss_after_mb": None,
+    "admission_in_flight": 0,
+    "admission_queue_depth": 0,
+    "admission_max_queue_depth": 0,
+    "admission_admitted": 0,
+    "admission_total_wait_ms": 0.0,
+    "admission_max_wait_ms": 0.0,
+    "admission_rejected": {},
+    "models": {},  # tier -> calls, errors, latency windows, per-task counts
+    "hedges_sent": 0,
+    "hedges_won": 0,
 }
 
+_LATENCY_WINDOW = 200  # recent calls kept per tier for percentiles
+
+# Request log lines, appended to QUERY_LOG_PATH by a background thread so
+# log_query() never does file I/O on the event loop
+_query_log: "queue.SimpleQueue[str | None]" = queue.SimpleQueue()
+_query_log_writer: threading.Thread | None = None
+_query_log_lock = threading.Lock()
+
+
+def worker_rss_mb() -> float:
+    """Current resident set size of this worker process, in MB."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # Fallback (no /proc): peak RSS, reported in bytes on macOS and KB elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
 
-def log_query(latency_ms: float) -> None:
+def log_index_load(version: int, rss_before_mb: float, rss_after_mb: float) -> None:
+    _METRICS["index_version"] = version
+    _METRICS["index_rss_before_mb"] = rss_before_mb
+    _METRICS["index_rss_after_mb"] = rss_after_mb
+
+
+def log_query(latency_ms: float, question: str | None = None, cache_hit: bool = False) -> None:
     _METRICS["queries"] += 1
     _METRICS["total_latency_ms"] += latency_ms
+    if cache_hit:
+        _METRICS["response_cache_hits"] += 1
+
+    # Request log (storage/query_logs.jsonl); the question text is only
+    # recorded when LOG_QUERY_TEXT is enabled, for the cache-warming job.
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "latency_ms": latency_ms,
+    }
+    if question is not None and settings.LOG_QUERY_TEXT:
+        record["question"] = question
+    _query_log.put(json.dumps(record) + "\n")
+    _start_query_log_writer()
+
+
+def _start_query_log_writer() -> None:
+    global _query_log_writer
+
+    if _query_log_writer is not None:
+        return
+    with _query_log_lock:
+        if _query_log_writer is None:
+            _query_log_writer = threading.Thread(target=_write_query_log, name="query-log", daemon=True)
+            _query_log_writer.start()
+
+
+def _write_query_log() -> None:
+    """Append queued lines, batching whatever piled up during each write."""
+    stopping = False
+    while not stopping:
+        lines = [_query_log.get()]
+        while True:
+            try:
+                lines.append(_query_log.get_nowait())
+            except queue.Empty:
+                break
+        stopping = None in lines
+        try:
+            with open(settings.QUERY_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write("".join(line for line in lines if line is not None))
+        except OSError:
+            pass
+
+
+@atexit.register
+def _stop_query_log_writer() -> None:
+    # The writer is a daemon thread: let it write what is queued first
+    if _query_log_writer is not None:
+        _query_log.put(None)
+        _query_log_writer.join(timeout=5)
+
+
+def log_retrieval_cache(hit: bool, entries: int) -> None:
+    _METRICS["retrieval_cache_hits" if hit else "retrieval_cache_misses"] += 1
+    _METRICS["retrieval_cache_entries"] = entries
+
+
+def _tier_stats(tier: str, model: str) -> dict:
+    stats = _METRICS["models"].setdefault(tier, {
+        "model": model,
+        "calls": 0,
+        "errors": 0,
+        "total_latency_ms": 0.0,
+        "recent_ms": deque(maxlen=_LATENCY_WINDOW),
+        "first_token_ms": deque(maxlen=_LATENCY_WINDOW),
+        "tasks": {},
+    })
+    stats["model"] = model
+    return stats
+
+
+def log_model_call(tier: str, model: str, task: str, latency_ms: float, error: bool = False) -> None:
+    stats = _tier_stats(tier, model)
+    stats["calls"] += 1
+    stats["errors"] += int(error)
+    stats["total_latency_ms"] += latency_ms
+    stats["recent_ms"].append(latency_ms)
+    stats["tasks"][task] = stats["tasks"].get(task, 0) + 1
+
+
+def log_first_token(tier: str, model: str, latency_ms: float) -> None:
+    _tier_stats(tier, model)["first_token_ms"].append(latency_ms)
+
+
+def log_hedge(won: bool) -> None:
+    _METRICS["hedges_sent"] += 1
+    _METRICS["hedges_won"] += int(won)
+
+
+def _percentile(tier: str, window: str, percentile: float, min_samples: int) -> float | None:
+    stats = _METRICS["models"].get(tier)
+    if stats is None or len(stats[window]) < min_samples:
+        return None
+    recent = sorted(stats[window])
+    return round(recent[min(len(recent) - 1, int(percentile * len(recent)))], 2)
+
+
+def tier_latency_ms(tier: str, percentile: float = 0.9, min_samples: int = 20) -> float | None:
+    """Recent latency percentile for a tier, or None until enough calls were seen."""
+    return _percentile(tier, "recent_ms", percentile, min_samples)
+
+
+def first_token_latency_ms(tier: str, percentile: float = 0.9, min_samples: int = 20) -> float | None:
+    """Recent time-to-first-token percentile for a tier's streamed calls."""
+    return _percentile(tier, "first_token_ms", percentile, min_samples)
+
+
+def set_admission_gauges(in_flight: int, queue_depth: int) -> None:
+    _METRICS["admission_in_flight"] = in_flight
+    _METRICS["admission_queue_depth"] = queue_depth
+    _METRICS["admission_max_queue_depth"] = max(_METRICS["admission_max_queue_depth"], queue_depth)
+
+
+def log_admission(wait_ms: float | None = None, rejected: int | None = None) -> None:
+    if rejected is not None:
+        counts = _METRICS["admission_rejected"]
+        counts[rejected] = counts.get(rejected, 0) + 1
+        return
+
+    _METRICS["admission_admitted"] += 1
+    _METRICS["admission_total_wait_ms"] += wait_ms or 0.0
+    _METRICS["admission_max_wait_ms"] = max(_METRICS["admission_max_wait_ms"], wait_ms or 0.0)
 
 
 def get_metrics():
@@ -21,4 +199,43 @@ def get_metrics():
     return {
         "total_queries": _METRICS["queries"],
         "avg_latency_ms": round(avg, 2),
+        "response_cache_hits": _METRICS["response_cache_hits"],
+        "retrieval_cache": {
+            "hits": _METRICS["retrieval_cache_hits"],
+            "misses": _METRICS["retrieval_cache_misses"],
+            "entries": _METRICS["retrieval_cache_entries"],
+        },
+        "worker_pid": os.getpid(),
+        "worker_rss_mb": worker_rss_mb(),
+        "index_version": _METRICS["index_version"],
+        "index_rss_before_mb": _METRICS["index_rss_before_mb"],
+        "index_rss_after_mb": _METRICS["index_rss_after_mb"],
+        "admission": {
+            "in_flight": _METRICS["admission_in_flight"],
+            "queue_depth": _METRICS["admission_queue_depth"],
+            "max_queue_depth": _METRICS["admission_max_queue_depth"],
+            "admitted": _METRICS["admission_admitted"],
+            "avg_wait_ms": round(
+                _METRICS["admission_total_wait_ms"] / _METRICS["admission_admitted"], 2
+            ) if _METRICS["admission_admitted"] else 0,
+            "max_wait_ms": round(_METRICS["admission_max_wait_ms"], 2),
+            "rejected": dict(_METRICS["admission_rejected"]),
+        },
+        "models": {
+            tier: {
+                "model": stats["model"],
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "avg_latency_ms": round(stats["total_latency_ms"] / stats["calls"], 2) if stats["calls"] else 0,
+                "p50_latency_ms": tier_latency_ms(tier, 0.5, min_samples=1),
+                "p90_latency_ms": tier_latency_ms(tier, 0.9, min_samples=1),
+                "p90_first_token_ms": first_token_latency_ms(tier, 0.9, min_samples=1),
+                "tasks": dict(stats["tasks"]),
+            }
+            for tier, stats in _METRICS["models"].items()
+        },
+        "hedging": {
+            "sent": _METRICS["hedges_sent"],
+            "won": _METRICS["hedges_won"],
+        },
     }
@@ -0,0 +1,148 @@
+"""
+Model routing: which model serves each LLM call of a chat turn.
+
+Tasks (classifier, answer, fallback, reformat) map to a tier through
+settings.MODEL_TASK_TIERS, and tiers to models through settings.MODEL_TIERS
+(fastest first). Cheap tasks default to the fast tier. For the answer and
+its fallbacks the tier is also picked per request:
+
+- a simple question with confident retrieval drops to the fastest tier;
+- a caller latency budget steps down to the fastest tier whose recent p90
+  latency (or configured estimate) fits in it.
+
+Models are built by a provider factory, replaceable with
+set_provider_factory() so tests and benchmarks can use stand-in models.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Optional
+
+from backend.config import settings
+from backend.services.metrics import log_model_call, tier_latency_ms
+
+_COMPLEX_MARKERS = re.compile(
+    r"\b(compar\w*|differen\w*|versus|vs|mechanism\w*|pathophysiolog\w*|why|"
+    r"interact\w*|contraindicat\w*|side effects?|prognos\w*|management)\b",
+    re.IGNORECASE,
+)
+
+_ROUTED_TASKS = ("answer", "fallback")
+
+
+@dataclass(frozen=True)
+class Route:
+    task: str
+    tier: str
+    model: str
+    reason: str
+
+
+# -------------------
+# Request signals
+# -------------------
+
+def is_complex_query(question: str) -> bool:
+    """Long, multi-part or comparative/mechanistic questions need the bigger model."""
+    if len(question.split()) > settings.ROUTER_SIMPLE_MAX_WORDS:
+        return True
+    if question.count("?") > 1:
+        return True
+    return bool(_COMPLEX_MARKERS.search(question))
+
+
+def retrieval_confidence(docs: List) -> Optional[float]:
+    """Best (lowest) FAISS distance among the retrieved chunks, if scored."""
+    scores = [
+        d.metadata["score"] for d in docs
+        if isinstance(getattr(d, "metadata", None), dict) and "score" in d.metadata
+    ]
+    return min(scores) if scores else None
+
+
+def _expected_latency_ms(tier: str) -> float:
+    observed = tier_latency_ms(tier)
+    if observed is not None:
+        return observed
+    return settings.MODEL_TIER_LATENCY_MS.get(tier, 0.0)
+
+
+# -------------------
+# Routing
+# -------------------
+
+def route_task(
+    task: str,
+    question: Optional[str] = None,
+    docs: Optional[List] = None,
+    latency_budget_ms: Optional[float] = None,
+) -> Route:
+    tiers = list(settings.MODEL_TIERS)
+    tier = settings.MODEL_TASK_TIERS.get(task, tiers[-1])
+    reason = "task default"
+
+    if task in _ROUTED_TASKS and question is not None and docs is not None:
+        best = retrieval_confidence(docs)
+        confident = best is not None and best <= settings.ROUTER_CONFIDENT_DISTANCE
+        if confident and not is_complex_query(question):
+            tier, reason = tiers[0], "simple question, confident retrieval"
+
+    if latency_budget_ms is not None:
+        position = tiers.index(tier)
+        while position > 0 and _expected_latency_ms(tiers[position]) > latency_budget_ms:
+            position -= 1
+            tier, reason = tiers[position], "latency budget"
+
+    return Route(task=task, tier=tier, model=settings.MODEL_TIERS[tier], reason=reason)
+
+
+# -------------------
+# Providers
+# -------------------
+
+def _openai_provider(model: str, **kwargs) -> Any:
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model=model, openai_api_key=settings.OPENAI_API_KEY, **kwargs)
+
+
+_provider_factory: Callable[..., Any] = _openai_provider
+
+
+def set_provider_factory(factory: Optional[Callable[..., Any]] = None) -> None:
+    """
+    Replace how chat models are built: factory(model, **kwargs) must return
+    a langchain chat model. None restores the OpenAI provider.
+    """
+    global _provider_factory
+    _provider_factory = factory or _openai_provider
+
+
+def chat_model(route: Route, **kwargs) -> Any:
+    return _provider_factory(route.model, **kwargs)
+
+
+@contextmanager
+def track(route: Route) -> Iterator[None]:
+    """
+    Record latency and outcome of one model call under its tier. Calls
+    cancelled by us (deadline, losing hedge) are not recorded.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except (asyncio.CancelledError, GeneratorExit):
+        raise
+    except BaseException:
+        _log_call(route, start, error=True)
+        raise
+    _log_call(route, start, error=False)
+
+
+def _log_call(route: Route, start: float, error: bool) -> None:
+    latency_ms = (time.perf_counter() - start) * 1000
+    log_model_call(route.tier, route.model, route.task, latency_ms, error=error)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    ONNX Runtime port of the sentence-transformers model.
+
+    Expects `model.onnx` and `tokenizer.json` in model_dir (see embeddings.export_onnx).
+    Mean pooling + L2 normalization reproduce the sentence-transformers
+    pipeline for all-MiniLM-L6-v2.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        batch_size: int = 64,
+        threads: int | None = None,
+        quantize: bool = False,
+        max_length: int = 256,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, "model.onnx")
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        for path in (model_path, tokenizer_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"{path} not found; run export_onnx() to create the ONNX model files"
+                )
+
+        if quantize:
+            model_path = self._quantized(model_path)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self._session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _quantized(model_path: str) -> str:
+        """Path to an int8 dynamically quantized copy, created on first use."""
+        quant_path = model_path.replace("model.onnx", "model_int8.onnx")
+        if not os.path.exists(quant_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(model_path, quant_path, weight_type=QuantType.QInt8)
+        return quant_path
+
+    def _embed_batch(self, texts: List[str]):
+        import numpy as np
+
+        encoded = self._tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        token_embeddings = self._session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalize
+        weights = mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[i:i + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
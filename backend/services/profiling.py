@@ -0,0 +1,185 @@
+"""
+Opt-in per-request profiling.
+
+A profiled request records wall-clock spans for each pipeline stage plus a
+sampled stack profile of the event-loop thread (collapsed-stack format,
+ready for flamegraph.pl / speedscope). Finished profiles go to a bounded
+ring buffer served by routes/profiles.py.
+
+When no profile is active, span() is a ContextVar lookup returning a shared
+no-op context manager, so the hot path pays nothing measurable.
+"""
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from backend.config import settings
+
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+_profiles: deque = deque(maxlen=settings.PROFILE_BUFFER_SIZE)
+_NULL = nullcontext()
+
+_samplers_lock = threading.Lock()
+_running_samplers = 0
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval_s: float):
+        super().__init__(daemon=True, name="request-profiler")
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfile:
+    def __init__(self, label: str, sample_stacks: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Dict] = []
+        self.finished = False
+        self._sampler: Optional[_StackSampler] = None
+
+        if sample_stacks:
+            self._sampler = _StackSampler(
+                threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+            )
+            self._sampler.start()
+
+    def add_span(self, name: str, start: float, end: float) -> None:
+        if self.finished:
+            return
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self._t0) * 1000, 2),
+            "duration_ms": round((end - start) * 1000, 2),
+        })
+
+    def finish(self) -> None:
+        global _running_samplers
+
+        if self.finished:
+            return
+        self.finished = True
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 2)
+
+        if self._sampler is not None:
+            self._sampler.stop()
+            with _samplers_lock:
+                _running_samplers -= 1
+
+        _profiles.append(self)
+
+    @property
+    def stacks(self) -> Counter:
+        return self._sampler.stacks if self._sampler is not None else Counter()
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": len(self.spans),
+            "samples": sum(self.stacks.values()),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            **self.summary(),
+            "span_details": self.spans,
+            "stacks": dict(self.stacks.most_common()),
+        }
+
+    def collapsed(self) -> str:
+        """Collapsed stacks: one 'frame;frame;frame count' line per stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# -------------------
+# Hot-path API
+# -------------------
+
+def should_profile(requested: bool) -> bool:
+    """Profile when the caller asked for it (authenticated header) or by sampling."""
+    if requested:
+        return True
+    rate = settings.PROFILE_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def start_profile(label: str) -> RequestProfile:
+    """Activate a profile for the current context (and tasks created from it)."""
+    global _running_samplers
+
+    with _samplers_lock:
+        sample_stacks = _running_samplers < settings.PROFILE_MAX_SAMPLERS
+        if sample_stacks:
+            _running_samplers += 1
+
+    profile = RequestProfile(label, sample_stacks)
+    _active.set(profile)
+    return profile
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _active.get()
+
+
+@contextmanager
+def _timed_span(profile: RequestProfile, name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, start, time.perf_counter())
+
+
+def span(name: str):
+    """Time a pipeline stage if the current request is being profiled."""
+    profile = _active.get()
+    if profile is None:
+        return _NULL
+    return _timed_span(profile, name)
+
+
+# -------------------
+# Ring buffer access
+# -------------------
+
+def list_profiles() -> List[Dict]:
+    return [p.summary() for p in reversed(_profiles)]
+
+
+def get_profile(profile_id: str) -> Optional[RequestProfile]:
+    for p in _profiles:
+        if p.id == profile_id:
+            return p
+    return None
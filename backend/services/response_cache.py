@@ -0,0 +1,85 @@
+"""
+Precomputed answers for frequent questions, filled offline by
+backend/scripts/warm_response_cache.py.
+
+Entries are keyed by (normalized question, index version), so they stop
+matching as soon as a new index version is published. SQLite keeps the
+cache shared between the batch job and every uvicorn worker.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import settings
+from backend.utils.formatting import normalize_question
+
+_local = threading.local()  # one connection per thread
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    question      TEXT    NOT NULL,
+    index_version INTEGER NOT NULL,
+    answer        TEXT    NOT NULL,
+    sources       TEXT    NOT NULL,
+    created_at    REAL    NOT NULL,
+    PRIMARY KEY (question, index_version)
+)
+"""
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(settings.RESPONSE_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(settings.RESPONSE_CACHE_PATH, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def get_cached_response(question: str, index_version: int) -> Optional[Tuple[str, List[Dict]]]:
+    """Return (answer, sources) for this question at this index version, if cached."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+
+    row = _conn().execute(
+        "SELECT answer, sources FROM responses WHERE question = ? AND index_version = ?",
+        (normalize_question(question), index_version),
+    ).fetchone()
+
+    if row is None:
+        return None
+    return row[0], json.loads(row[1])
+
+
+def put_cached_response(
+    question: str,
+    index_version: int,
+    answer: str,
+    sources: List[Dict],
+) -> None:
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (normalize_question(question), index_version, answer, json.dumps(sources), time.time()),
+        )
+
+
+def cached_questions(index_version: int) -> List[str]:
+    rows = _conn().execute(
+        "SELECT question FROM responses WHERE index_version = ?", (index_version,)
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def purge_stale(index_version: int) -> int:
+    """Drop entries for any other index version; returns how many were removed."""
+    conn = _conn()
+    with conn:
+        cur = conn.execute("DELETE FROM responses WHERE index_version != ?", (index_version,))
+    return cur.rowcount
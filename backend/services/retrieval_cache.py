@@ -0,0 +1,83 @@
+"""
+LRU cache of retrieval results: (normalized query, k, index version) ->
+[(docstore id, score), ...].
+
+Repeated questions (suggested prompts, retries) skip both the query
+embedding and the FAISS search. Only ids and scores are cached, so an entry
+costs a few hundred bytes; documents are read back from the docstore of the
+index snapshot being searched. Entries carry the index version and the whole
+cache is cleared when a new version is opened (see retriever._open_published).
+
+Imported lazily by retriever.get_retriever, like the rest of langchain.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.config import settings
+from backend.services.metrics import log_retrieval_cache
+from backend.utils.formatting import normalize_question
+
+_MAX_QUERY_CHARS = 1000  # long, one-off queries are not worth an entry
+
+_cache: "OrderedDict[Tuple[str, int, int], List[Tuple[str, float]]]" = OrderedDict()
+_lock = threading.Lock()  # retrieval runs in executor threads
+
+
+def _get(key: Tuple[str, int, int]) -> Optional[List[Tuple[str, float]]]:
+    with _lock:
+        hits = _cache.get(key)
+        if hits is not None:
+            _cache.move_to_end(key)
+    log_retrieval_cache(hit=hits is not None, entries=len(_cache))
+    return hits
+
+
+def _put(key: Tuple[str, int, int], hits: List[Tuple[str, float]]) -> None:
+    with _lock:
+        _cache[key] = hits
+        _cache.move_to_end(key)
+        while len(_cache) > settings.RETRIEVAL_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_retrieval_cache() -> None:
+    with _lock:
+        _cache.clear()
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Similarity retriever over one index snapshot (a ShardedIndex), with
+    the LRU above in front of the search. Returned documents carry the raw
+    FAISS distance in metadata["score"].
+    """
+
+    index: Any
+    k: int = 3
+    index_version: int = 0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        normalized = normalize_question(query)
+        cacheable = settings.RETRIEVAL_CACHE_SIZE > 0 and len(normalized) <= _MAX_QUERY_CHARS
+        key = (normalized, self.k, self.index_version)
+
+        hits = _get(key) if cacheable else None
+        if hits is None:
+            hits = self.index.search(query, self.k)
+            if cacheable:
+                _put(key, hits)
+
+        docs = []
+        for doc_id, score in hits:
+            doc = self.index.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                continue
+            docs.append(Document(page_content=doc.page_content, metadata={**doc.metadata, "score": score}))
+        return docs
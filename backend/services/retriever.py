@@ -2,19 +2,33 @@ from __future__ import annotations
 
 import os
 import json
+import asyncio
 import hashlib
-from typing import List, Tuple, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Set, Tuple, Dict
 
+from backend.services import index_store
 from backend.services.embeddings import get_hf_embeddings
-from backend.utils.pdf_loader import load_pdf_folder, split_documents
+from backend.services.metrics import log_index_load, worker_rss_mb
+from backend.services.sharded_index import ShardedIndex, shard_of
+from backend.services.vectorstores import (
+    LocalFaissStore,
+    concurrent_delete,
+    get_vector_store,
+    pipelined_upsert,
+)
+from backend.utils.pdf_loader import file_sha256, iter_pdf_pages, iter_split_documents, list_pdfs
 from backend.config import settings
 
-from langchain_community.vectorstores import FAISS
-from backend.services.embeddings import get_hf_embeddings
-from backend.utils.pdf_loader import load_pdf_folder, split_documents
-from backend.config import settings
+# FAISS / langchain are imported lazily (see services/warmup.py)
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
 
-_vectorstore = None  # cache
+_vectorstore: Optional[ShardedIndex] = None  # cache (read-only view of the shared on-disk index)
+_index_version = 0  # published version _vectorstore was opened from
+_live_update_lock = threading.Lock()  # serializes writers within this worker
 # -------------------
 # Local manifest for incremental indexing
 # -------------------
@@ -74,17 +88,11 @@ def _chunk_id(
 # Incremental Indexing Helpers
 # -------------------
 
-def _prepare_incremental_batches(chunks) -> Tuple[List, List[str]]:
+def _iter_new_chunks(chunks: Iterable, known: Dict[str, Dict]) -> Iterator[Tuple]:
     """
-    Return only the NEW/CHANGED chunks with their IDs,
+    Lazily yield (doc, id, manifest entry) for NEW/CHANGED chunks only,
     skipping ones already in the manifest.
     """
-    manifest = _load_manifest()
-    known = manifest.get("chunks", {})
-
-    new_docs = []
-    new_ids = []
-
     for idx, doc in enumerate(chunks):
         meta = getattr(doc, "metadata", {}) or {}
         source = meta.get("source", "unknown")
@@ -98,104 +106,93 @@ def _prepare_incremental_batches(chunks) -> Tuple[List, List[str]]:
         if cid in known:
             continue
 
-        new_docs.append(doc)
-        new_ids.append(cid)
+        yield doc, cid, {"source": source, "page": page, "hash": h}
+
 
-    return new_docs, new_ids
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
 
 
-def _update_manifest(chunks, ids: List[str]) -> None:
-    """Update manifest after successful indexing."""
-    if not ids:
+def _update_manifest(entries: Dict[str, Dict], files: Dict[str, str] | None = None) -> None:
+    """
+    Update manifest after successful indexing.
+    `entries` maps chunk id -> {source, page, hash};
+    `files` maps content hash -> source for the PDFs that were processed.
+    """
+    if not entries and not files:
         return
 
     manifest = _load_manifest()
-    known = manifest.setdefault("chunks", {})
-
-    for doc, cid in zip(chunks, ids):
-        meta = getattr(doc, "metadata", {}) or {}
-        source = meta.get("source", "unknown")
-        page = meta.get("page", "N/A")
-
-        content = (getattr(doc, "page_content", "") or "").strip()
-
-        known[cid] = {
-            "source": source,
-            "page": page,
-            "hash": _sha256(content),
-        }
+    manifest.setdefault("chunks", {}).update(entries)
+    manifest.setdefault("files", {}).update(files or {})
 
     _save_manifest(manifest)
 
 
-# -------------------
-# Pinecone Batching Helpers
-# -------------------
-
-def _batch_upsert(vs, documents, ids, batch_size: int = 1000):
-    """Upsert in batches to avoid Pinecone's 1000-item limit."""
-    for i in range(0, len(documents), batch_size):
-        vs.add_documents(
-            documents=documents[i:i + batch_size],
-            ids=ids[i:i + batch_size]
-        )
-
-
-def _batch_delete(index, ids, batch_size: int = 1000):
-    """Delete in batches to avoid Pinecone's 1000-item limit."""
-    for i in range(0, len(ids), batch_size):
-        index.delete(ids=ids[i:i + batch_size])
-
-
 # -------------------
 # Main Indexing Function
 # -------------------
 
 async def index_documents(folder_path: str) -> int:
+    """Index the PDFs in a folder (see index_files)."""
+    return await index_files(list_pdfs(folder_path))
+
+
+async def index_files(paths: List[str]) -> int:
     """
-    Incremental indexing:
-    - Load PDFs
-    - Split into chunks
+    Incremental, streaming indexing:
+    - Skip PDFs whose content hash was already indexed
+    - Load PDFs page by page (from the parsed-page cache when possible)
+    - Split into chunks lazily
     - Skip already indexed chunks
-    - Embed & upsert only new ones
+    - Embed & upsert only new ones, one bounded batch at a time
 
     Returns:
         int: Number of chunks actually indexed
     """
-    # 1) Load & split
-    docs = load_pdf_folder(folder_path)
-    chunks = split_documents(docs)
-
-    # 2) Filter new / changed chunks
-    new_docs, new_ids = _prepare_incremental_batches(chunks)
-    if not new_docs:
+    # 1) Identical re-uploads return before any parsing
+    manifest = _load_manifest()
+    known_files = manifest.get("files", {})
+    hashes = {path: file_sha256(path) for path in paths}
+    pending = {sha: path for path, sha in hashes.items() if sha not in known_files}
+    if not pending:
         return 0
 
-    # 3) Ensure Pinecone index exists
-    pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-    existing = [idx.name for idx in pc.list_indexes()]
-
-    if settings.INDEX_NAME not in existing:
-        pc.create_index(
-            name=settings.INDEX_NAME,
-            dimension=384,
-            metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-        )
-
-    # 4) Upsert to Pinecone
-    embeddings = get_hf_embeddings()
-    vs = PineconeVectorStore.from_existing_index(
-        index_name=settings.INDEX_NAME,
-        embedding=embeddings,
+    # 2) Lazy pipeline: pages -> chunks -> new chunks -> batches.
+    #    Only the manifest entries (a few small fields per chunk) accumulate.
+    pages = (page for sha, path in pending.items() for page in iter_pdf_pages(path, sha))
+    chunks = iter_split_documents(
+        pages,
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        by_tokens=settings.CHUNK_BY_TOKENS,
+    )
+    entries: Dict[str, Dict] = {}
+
+    def batches() -> Iterator[Tuple[List, List[str]]]:
+        new_chunks = _iter_new_chunks(chunks, manifest.get("chunks", {}))
+        for batch in _batched(new_chunks, 1000):
+            for _doc, cid, entry in batch:
+                entries[cid] = entry
+            yield [doc for doc, _, _ in batch], [cid for _, cid, _ in batch]
+
+    # 3) Embed once and upsert to the durable store and the live chat index,
+    #    pipelined with bounded concurrency and retries
+    stores = [LocalFaissStore()]
+    remote = get_vector_store()
+    if remote is not None:
+        stores.append(remote)
+
+    count = await asyncio.to_thread(
+        pipelined_upsert, stores, get_hf_embeddings(), batches()
     )
 
-    _batch_upsert(vs, new_docs, new_ids, batch_size=1000)
-
-    # 5) Update manifest
-    _update_manifest(new_docs, new_ids)
+    # 4) Update manifest
+    _update_manifest(entries, files=pending)
 
-    return len(new_docs)
+    return count
 
 
 # -------------------
@@ -237,7 +234,7 @@ def list_indexed_docs() -> List[Dict]:
 
 def delete_document(source: str) -> Dict:
     """
-    Delete all chunks for a given source from Pinecone and manifest.
+    Delete all chunks for a given source from the vector stores and manifest.
     """
     manifest = _load_manifest()
     chunks = manifest.get("chunks", {})
@@ -253,18 +250,28 @@ def delete_document(source: str) -> Dict:
             "message": f"No document found with source '{source}'"
         }
 
-    # Delete from Pinecone
-    pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-    index = pc.Index(settings.INDEX_NAME)
+    # Delete from the durable store
+    remote = get_vector_store()
+    if remote is not None:
+        concurrent_delete(remote, ids_to_delete, batch_size=1000)
 
-    _batch_delete(index, ids_to_delete, batch_size=1000)
+    # Drop the same chunks from the live chat index
+    _update_live_index(delete_source=source)
 
-    # Remove from manifest
+    # Remove from manifest (file hashes too, so a re-upload indexes again)
     for cid in ids_to_delete:
         chunks.pop(cid, None)
 
+    files = manifest.get("files", {})
+    for sha in [sha for sha, src in files.items() if src == source]:
+        files.pop(sha)
+
     _save_manifest(manifest)
 
+    # An uploaded file would come back with the next rebuild
+    if _is_upload(source) and os.path.exists(source):
+        os.remove(source)
+
     return {
         "deleted_chunks": len(ids_to_delete),
         "source": source,
@@ -273,33 +280,390 @@ def delete_document(source: str) -> Dict:
 
 
 # -------------------
-# Retriever Builder
+# Live Index Updates (copy-on-write)
 # -------------------
 
+def _clone_vectorstore(vs: FAISS) -> FAISS:
+    """
+    Private, writable copy of a (possibly memory-mapped) vectorstore. The
+    docstore copy shares the chunk text; changes go to its overlay.
 
-def get_retriever():
+    The index is copied through serialization: faiss.clone_index of a
+    memory-mapped index still views the mapped codes, and adding to or
+    removing from it aborts the process.
     """
-    Return a FAISS-based retriever built from local PDFs.
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    return FAISS(
+        embedding_function=vs.embedding_function,
+        index=faiss.deserialize_index(faiss.serialize_index(vs.index)),
+        docstore=vs.docstore.clone(),
+        index_to_docstore_id=dict(vs.index_to_docstore_id),
+    )
+
+
+def _update_live_index(
+    add_docs: List | None = None,
+    add_ids: List[str] | None = None,
+    add_vectors: List[List[float]] | None = None,
+    delete_ids: List[str] | None = None,
+    delete_source: str | None = None,
+) -> None:
     """
-    global _vectorstore
+    Apply an incremental change to the chat index without blocking readers.
+
+    The change is made on clones of the affected shards of the latest
+    published version, which is then published and swapped in atomically
+    (untouched shards are carried over as they are). In-flight searches
+    keep using the snapshot they started with; other workers pick up the
+    new version on their next reload check.
+    """
+    from langchain_community.vectorstores import FAISS
+    from backend.services.compact_docstore import CompactDocstore
+
+    embeddings = get_hf_embeddings()
+
+    # Embed outside the locks (unless the caller already did); this is the slow part
+    pairs, metadatas, ids = [], [], []
+    if add_docs:
+        texts = [d.page_content for d in add_docs]
+        vectors = add_vectors if add_vectors is not None else embeddings.embed_documents(texts)
+        pairs = list(zip(texts, vectors))
+        metadatas = [d.metadata for d in add_docs]
+        ids = list(add_ids or [])
+
+    with _live_update_lock, index_store.build_lock():
+        version = index_store.read_current_version()
+        if version is None:
+            # Build the base library first, or it would never be built:
+            # readers only build when nothing is published. Files this
+            # change adds are left to it, so they are not indexed twice.
+            adding = {os.path.normpath(str(m.get("source", ""))) for m in metadatas}
+            paths = [p for p in _corpus_paths() if os.path.normpath(p) not in adding]
+            if paths:
+                version = _build_locked(paths, None)
+        if version is not None:
+            shards = list(index_store.open_version(version, embeddings, previous=_vectorstore).shards)
+        else:
+            shards = [None] * settings.INDEX_SHARDS
+        num_shards = len(shards)
+        touched: Set[int] = set()
+
+        def writable(shard: int):
+            if shard not in touched:
+                touched.add(shard)
+                if shards[shard] is not None:
+                    shards[shard] = _clone_vectorstore(shards[shard])
+            return shards[shard]
+
+        # Adds go to the shard of their source
+        by_shard: Dict[int, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            by_shard.setdefault(shard_of(meta.get("source", "unknown"), num_shards), []).append(i)
+
+        for shard, positions in by_shard.items():
+            vs = shards[shard]
+            fresh = [i for i in positions if vs is None or ids[i] not in vs.docstore]
+            if not fresh:
+                continue
+            vs = writable(shard)
+            if vs is None:
+                shards[shard] = FAISS.from_embeddings(
+                    [pairs[i] for i in fresh],
+                    embeddings,
+                    metadatas=[metadatas[i] for i in fresh],
+                    ids=[ids[i] for i in fresh],
+                    docstore=CompactDocstore(),
+                )
+            else:
+                vs.add_embeddings(
+                    [pairs[i] for i in fresh],
+                    metadatas=[metadatas[i] for i in fresh],
+                    ids=[ids[i] for i in fresh],
+                )
+
+        # Deletes by id may hit any shard; deletes by source only one
+        if delete_ids or delete_source is not None:
+            wanted = set(delete_ids or [])
+            source_shard = shard_of(delete_source, num_shards) if delete_source is not None else None
+
+            for shard, vs in enumerate(shards):
+                if vs is None or (not wanted and shard != source_shard):
+                    continue
+                stale = {doc_id for doc_id in wanted if doc_id in vs.docstore}
+                if shard == source_shard:
+                    stale.update(vs.docstore.ids_for_source(delete_source))
+                if stale:
+                    writable(shard).delete(list(stale))
+
+        if not touched:
+            return
+
+        unchanged = [shard for shard in range(num_shards) if shard not in touched]
+        corpus = _updated_corpus(version, metadatas, delete_source)
+        version = index_store.publish(shards, unchanged=unchanged, corpus=corpus)
+
+    _open_published(version)
+
+
+# -------------------
+# Retriever Builder
+# -------------------
+
+def get_index_version() -> int:
+    """
+    Return the version of the corpus currently served to chat.
+
+    Anything keyed on retrieval results (coalescing, caches) should
+    include this so it goes stale when documents change.
+    """
+    return _index_version
 
-    if _vectorstore is None:
-        embeddings = get_hf_embeddings()
 
-        # 1. Load PDFs
-        documents = load_pdf_folder(settings.PDF_DIR)
+def is_index_open() -> bool:
+    """True once this worker has a published index open (warm-up, upload or rebuild)."""
+    return _vectorstore is not None
 
-        # 2. Split documents
-        splits = split_documents(documents)
 
-        # 3. Build FAISS index
-        _vectorstore = FAISS.from_documents(
-            splits,
-            embedding=embeddings,
-        )
+def _build_shard(paths: List[str], embeddings, hashes: Dict[str, str] | None = None) -> Optional[FAISS]:
+    """Build one shard's FAISS index from its PDFs, streaming batch by batch."""
+    from langchain_community.vectorstores import FAISS
+    from backend.services.compact_docstore import CompactDocstore
 
-    return _vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": 3},
+    # 1. Stream pages and chunks from the shard's PDFs
+    hashes = hashes or {}
+    pages = (page for path in paths for page in iter_pdf_pages(path, hashes.get(path)))
+    splits = iter_split_documents(
+        pages,
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        by_tokens=settings.CHUNK_BY_TOKENS,
     )
 
+    # 2. Build the FAISS index batch by batch
+    vectorstore = None
+    for batch in _batched(splits, 1000):
+        texts = [d.page_content for d in batch]
+        pairs = list(zip(texts, embeddings.embed_documents(texts)))
+        metadatas = [d.metadata for d in batch]
+
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(
+                pairs, embeddings, metadatas=metadatas, docstore=CompactDocstore()
+            )
+        else:
+            vectorstore.add_embeddings(pairs, metadatas=metadatas)
+
+    return vectorstore
+
+
+def _corpus_paths() -> List[str]:
+    """PDFs a full build indexes: the library in PDF_DIR plus uploads."""
+    return list_pdfs(settings.PDF_DIR) + list_pdfs(settings.UPLOAD_DIR)
+
+
+def _is_upload(source: str) -> bool:
+    upload_dir = os.path.abspath(settings.UPLOAD_DIR)
+    return os.path.dirname(os.path.abspath(source)) == upload_dir
+
+
+def _build_and_publish(force: bool = False, only_shards: Set[int] | None = None) -> int:
+    """
+    Build the sharded FAISS index from PDF_DIR and UPLOAD_DIR and publish
+    it for all workers.
+    Shards build in parallel; with `only_shards`, just those are rebuilt and
+    the rest are carried over from the current version.
+    Runs under the cross-process build lock, so only one worker pays for it.
+    """
+    with index_store.build_lock():
+        # Another worker may have published while we waited for the lock
+        version = index_store.read_current_version()
+        if version is not None and not force:
+            return version
+
+        paths = _corpus_paths()
+        if not paths:
+            raise ValueError(f"No PDFs to index in {settings.PDF_DIR!r}")
+        return _build_locked(paths, version, only_shards)
+
+
+def _build_locked(paths: List[str], version: int | None, only_shards: Set[int] | None = None) -> int:
+    """Build (some shards of) the index from `paths` and publish. Caller holds build_lock()."""
+    num_shards = settings.INDEX_SHARDS
+    if version is None or index_store.read_shard_count(version) != num_shards:
+        only_shards = None  # nothing to carry over: build every shard
+
+    by_shard: Dict[int, List[str]] = {shard: [] for shard in range(num_shards)}
+    for path in paths:
+        by_shard[shard_of(path, num_shards)].append(path)
+
+    todo = sorted(only_shards) if only_shards is not None else list(range(num_shards))
+    embeddings = get_hf_embeddings()
+
+    # Fingerprint what is about to be indexed; carried-over shards keep theirs
+    previous = (index_store.read_corpus(version) or {}) if version is not None else {}
+    corpus = {p: entry for p, entry in previous.items() if shard_of(p, num_shards) not in todo}
+    fresh = _fingerprint([path for shard in todo for path in by_shard[shard]], previous)
+    corpus.update(fresh)
+    hashes = {path: fresh[os.path.normpath(path)]["sha256"] for shard in todo for path in by_shard[shard]}
+
+    # Parsing is per shard; embedding and FAISS adds release the GIL
+    workers = max(1, min(len(todo), settings.INDEX_BUILD_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-build") as pool:
+        built = dict(zip(todo, pool.map(lambda shard: _build_shard(by_shard[shard], embeddings, hashes), todo)))
+
+    shards = [built.get(shard) for shard in range(num_shards)]
+    unchanged = [shard for shard in range(num_shards) if shard not in built]
+    return index_store.publish(shards, unchanged=unchanged, corpus=corpus)
+
+
+# -------------------
+# Corpus fingerprints
+# -------------------
+# Each published version records (sha256, size, mtime) of the PDFs it was
+# built from, so a restart can tell which shards no longer match the files
+# on disk. Unchanged size and mtime skip re-hashing.
+
+def _fingerprint(paths: Iterable[str], known: Dict[str, Dict] | None = None) -> Dict[str, Dict]:
+    known = known or {}
+    out: Dict[str, Dict] = {}
+    for path in paths:
+        key = os.path.normpath(path)
+        st = os.stat(path)
+        entry = known.get(key)
+        if entry is None or entry.get("size") != st.st_size or entry.get("mtime_ns") != st.st_mtime_ns:
+            entry = {"sha256": file_sha256(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        out[key] = entry
+    return out
+
+
+def _updated_corpus(
+    version: int | None,
+    metadatas: List[Dict],
+    delete_source: str | None,
+) -> Dict[str, Dict] | None:
+    """The corpus record after a live update (added uploads in, deleted source out)."""
+    corpus = index_store.read_corpus(version) if version is not None else {}
+    if corpus is None:
+        return None  # not recorded: the next start rebuilds anyway
+
+    on_disk = {os.path.normpath(p): p for p in _corpus_paths()}
+    added = {os.path.normpath(str(m.get("source", ""))) for m in metadatas}
+    corpus.update(_fingerprint([on_disk[key] for key in added if key in on_disk], corpus))
+    if delete_source is not None:
+        corpus.pop(os.path.normpath(delete_source), None)
+    return corpus
+
+
+def _stale_shards(version: int, paths: List[str]) -> Set[int]:
+    """Shards of `version` whose PDFs were added, removed or changed since it was built."""
+    num_shards = settings.INDEX_SHARDS
+    recorded = index_store.read_corpus(version)
+    if recorded is None or index_store.read_shard_count(version) != num_shards:
+        return set(range(num_shards))
+
+    current = _fingerprint(paths, recorded)
+    changed = {
+        path for path in recorded.keys() | current.keys()
+        if recorded.get(path, {}).get("sha256") != current.get(path, {}).get("sha256")
+    }
+    return {shard_of(path, num_shards) for path in changed}
+
+
+def _sync_published() -> int:
+    """
+    Return a published version that matches the PDFs on disk: build one
+    if there is none, else rebuild only the shards whose files changed.
+    """
+    with index_store.build_lock():
+        version = index_store.read_current_version()
+        paths = _corpus_paths()
+        if version is None:
+            if not paths:
+                raise ValueError(f"No PDFs to index in {settings.PDF_DIR!r}")
+            return _build_locked(paths, None)
+
+        stale = _stale_shards(version, paths)
+        if not stale:
+            return version
+        print(f"⚠️ PDFs changed since index v{version}; rebuilding shards {sorted(stale)}")
+        return _build_locked(paths, version, stale)
+
+
+def _open_published(version: int) -> None:
+    """Swap this worker onto a published version (memory-mapped, read-only)."""
+    _swap_published(version, *_load_published(version))
+
+
+def _load_published(version: int) -> Tuple[ShardedIndex, float]:
+    """
+    Open a published version (unpickles id maps, maps shards): the slow
+    part of a swap, safe to run in a thread. Returns it with the RSS before.
+    """
+    rss_before = worker_rss_mb()
+    return index_store.open_version(version, get_hf_embeddings(), previous=_vectorstore), rss_before
+
+
+def _swap_published(version: int, vectorstore: ShardedIndex, rss_before: float) -> None:
+    global _vectorstore, _index_version
+
+    from backend.services.retrieval_cache import clear_retrieval_cache
+
+    if _vectorstore is not None and version < _index_version:
+        return  # a newer version was swapped in while this one was opening
+    _vectorstore = vectorstore
+    _index_version = version
+    clear_retrieval_cache()  # entries are per-version; drop the old ones
+    log_index_load(version, rss_before, worker_rss_mb())
+
+
+async def watch_published() -> None:
+    """
+    Background task (app lifespan): every INDEX_RELOAD_INTERVAL_S, pick up
+    a version published by another worker. It is opened in a thread and
+    only swapped in on the event loop, so requests never wait on a reload.
+    """
+    while True:
+        await asyncio.sleep(settings.INDEX_RELOAD_INTERVAL_S)
+        if _vectorstore is None:
+            continue  # warm-up opens the first version
+        try:
+            version = await asyncio.to_thread(index_store.read_current_version)
+            if version is not None and version != _index_version:
+                _swap_published(version, *await asyncio.to_thread(_load_published, version))
+        except Exception as e:
+            print("⚠️ Index reload failed:", e)
+
+
+def rebuild_index(source: str | None = None) -> int:
+    """
+    Rebuild from PDF_DIR and UPLOAD_DIR and publish a new version. Every
+    worker switches to it on its next reload check (watch_published).
+
+    With `source`, only the shard holding that document is rebuilt.
+    """
+    only_shards = {shard_of(source, settings.INDEX_SHARDS)} if source is not None else None
+    version = _build_and_publish(force=True, only_shards=only_shards)
+    _open_published(version)
+    return version
+
+
+def get_retriever():
+    """
+    Return a retriever over the shared, published (sharded) index, with
+    the retrieval result cache in front of it.
+    The first worker to start builds and publishes it (or rebuilds the
+    shards whose PDFs changed since); the rest open it. Newer versions are
+    picked up by watch_published, not here.
+    """
+    from backend.services.retrieval_cache import CachedRetriever
+
+    if _vectorstore is None:
+        _open_published(_sync_published())
+
+    return CachedRetriever(
+        index=_vectorstore,
+        k=3,
+        index_version=_index_version,
+    )
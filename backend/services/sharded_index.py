@@ -0,0 +1,121 @@
+"""
+Vector index partitioned into shards by document source.
+
+Each shard is an ordinary langchain FAISS vectorstore with its own index
+file (see index_store.py for the on-disk layout). A query is embedded once,
+searched on every shard in parallel and the per-shard top-k lists are
+merged. All chunks of a source live in the same shard, so re-indexing or
+deleting a document only rebuilds and republishes that shard.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def shard_of(source, num_shards: int) -> int:
+    """Stable shard number for a document source (same in every worker)."""
+    if num_shards <= 1:
+        return 0
+    digest = hashlib.sha1(os.path.normpath(str(source)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % num_shards
+
+
+def _search_pool() -> ThreadPoolExecutor:
+    # FAISS releases the GIL while searching, so threads run shards in parallel
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=min(32, os.cpu_count() or 1),
+                thread_name_prefix="shard-search",
+            )
+        return _pool
+
+
+def _search_shard(vs: FAISS, vector, k: int) -> List[Tuple[float, str]]:
+    scores, indices = vs.index.search(vector, k)
+    return [
+        (float(score), vs.index_to_docstore_id[i])
+        for i, score in zip(indices[0], scores[0])
+        if i != -1
+    ]
+
+
+class ShardedDocstore:
+    """Read-only docstore facade: looks an id up in each shard's docstore."""
+
+    def __init__(self, shards: Sequence[Optional[FAISS]]):
+        self._shards = shards
+
+    def search(self, doc_id: str):
+        for vs in self._shards:
+            if vs is None:
+                continue
+            doc = vs.docstore.search(doc_id)
+            if not isinstance(doc, str):
+                return doc
+        return f"ID {doc_id} not found."
+
+
+class ShardedIndex:
+    """
+    A published index version: one FAISS vectorstore per shard (None for
+    an empty shard). `keys` identify each shard's files on disk, so
+    reopening a version can reuse shards that did not change.
+    """
+
+    def __init__(self, shards: List[Optional[FAISS]], embeddings, keys: Optional[List] = None):
+        self.shards = shards
+        self.embeddings = embeddings
+        self.keys = keys or [None] * len(shards)
+        self.docstore = ShardedDocstore(shards)
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.shards)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(vs.index.ntotal for vs in self.shards if vs is not None)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Top-k (docstore id, score) across all shards. Scores are the raw
+        FAISS scores, as returned by similarity_search_with_score.
+        """
+        import faiss
+        import numpy as np
+
+        live = [vs for vs in self.shards if vs is not None and vs.index.ntotal]
+        if not live:
+            return []
+
+        vector = np.array([self.embeddings.embed_query(query)], dtype=np.float32)
+        if live[0]._normalize_L2:
+            faiss.normalize_L2(vector)
+
+        # Scatter: each shard returns its own top-k
+        if len(live) == 1:
+            results = [_search_shard(live[0], vector, k)]
+        else:
+            results = list(_search_pool().map(lambda vs: _search_shard(vs, vector, k), live))
+
+        # Gather: global top-k (inner product ranks high-to-low, L2 low-to-high)
+        candidates = [hit for hits in results for hit in hits]
+        if live[0].distance_strategy == "MAX_INNER_PRODUCT":
+            top = heapq.nlargest(k, candidates, key=lambda hit: hit[0])
+        else:
+            top = heapq.nsmallest(k, candidates, key=lambda hit: hit[0])
+
+        return [(doc_id, score) for score, doc_id in top]
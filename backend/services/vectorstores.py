@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from backend.config import settings
+
+
+# -------------------
+# Backend Interface
+# -------------------
+
+class VectorStoreBackend(ABC):
+    """
+    Minimal write interface used by indexing. Vectors are computed by the
+    caller, so one embedding pass can feed several stores.
+    """
+
+    def ensure_index(self) -> None:
+        """Create the index if needed. Implementations should cache the check."""
+
+    @abstractmethod
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List) -> None:
+        """Write one batch. May be called concurrently from worker threads."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """Delete one batch of ids. May be called concurrently."""
+
+    def flush(self) -> None:
+        """Commit anything buffered by upsert/delete."""
+
+    def is_transient(self, error: Exception) -> bool:
+        """Whether a failed upsert/delete is worth retrying. Default: never."""
+        return False
+
+
+def _is_network_error(error: Exception) -> bool:
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        from urllib3.exceptions import HTTPError as Urllib3Error
+    except ImportError:
+        return False
+    return isinstance(error, Urllib3Error)
+
+
+class PineconeStore(VectorStoreBackend):
+    """Remote Pinecone serverless index, in the layout langchain_pinecone reads."""
+
+    _known_indexes: set = set()  # process-wide cache of indexes known to exist
+    _lock = threading.Lock()
+
+    def __init__(self, index_name: str = settings.INDEX_NAME, dimension: int = 384):
+        from pinecone import Pinecone
+
+        self.index_name = index_name
+        self.dimension = dimension
+        self._pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+        self._index = None
+
+    def ensure_index(self) -> None:
+        if self.index_name in self._known_indexes:
+            return
+
+        with self._lock:
+            if self.index_name in self._known_indexes:
+                return
+
+            from pinecone import ServerlessSpec
+
+            existing = [idx.name for idx in self._pc.list_indexes()]
+            if self.index_name not in existing:
+                self._pc.create_index(
+                    name=self.index_name,
+                    dimension=self.dimension,
+                    metric="cosine",
+                    spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+                )
+            self._known_indexes.add(self.index_name)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._pc.Index(self.index_name)
+        return self._index
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List) -> None:
+        records = [
+            {
+                "id": cid,
+                "values": vector,
+                # "text" is the default text_key of PineconeVectorStore
+                "metadata": {**(doc.metadata or {}), "text": doc.page_content},
+            }
+            for cid, vector, doc in zip(ids, vectors, documents)
+        ]
+        self.index.upsert(vectors=records, batch_size=100)
+
+    def delete(self, ids: List[str]) -> None:
+        self.index.delete(ids=ids)
+
+    def is_transient(self, error: Exception) -> bool:
+        # Pinecone API errors carry the HTTP status; 4xx (auth, validation)
+        # will fail the same way again
+        status = getattr(error, "status", None)
+        if isinstance(status, int):
+            return status >= 500
+        return _is_network_error(error)
+
+
+class LocalFaissStore(VectorStoreBackend):
+    """
+    The live chat index (see retriever._update_live_index). Writes are
+    buffered and applied as one copy-on-write publish on flush(), or early
+    once max_buffer chunks are pending so large uploads stay bounded.
+    """
+
+    def __init__(self, max_buffer: int = 10_000):
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._vectors: List[List[float]] = []
+        self._documents: List = []
+        self._deleted: List[str] = []
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List) -> None:
+        with self._lock:
+            self._ids.extend(ids)
+            self._vectors.extend(vectors)
+            self._documents.extend(documents)
+            full = len(self._ids) >= self.max_buffer
+
+        if full:
+            self.flush()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            self._deleted.extend(ids)
+
+    def flush(self) -> None:
+        from backend.services.retriever import _update_live_index
+
+        with self._lock:
+            ids, vectors, documents, deleted = (
+                self._ids, self._vectors, self._documents, self._deleted
+            )
+            self._ids, self._vectors, self._documents, self._deleted = [], [], [], []
+
+        if ids or deleted:
+            _update_live_index(
+                add_docs=documents,
+                add_ids=ids,
+                add_vectors=vectors,
+                delete_ids=deleted,
+            )
+
+
+class InMemoryStore(VectorStoreBackend):
+    """
+    Local stand-in for the remote store, for tests and offline runs.
+    fail_rate injects transient errors to exercise retries.
+    """
+
+    def __init__(self, fail_rate: float = 0.0, latency_s: float = 0.0):
+        self.records: Dict[str, tuple] = {}
+        self.fail_rate = fail_rate
+        self.latency_s = latency_s
+        self._lock = threading.Lock()
+
+    def _call(self) -> None:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise ConnectionError("injected transient failure")
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List) -> None:
+        self._call()
+        with self._lock:
+            for cid, vector, doc in zip(ids, vectors, documents):
+                self.records[cid] = (vector, doc)
+
+    def delete(self, ids: List[str]) -> None:
+        self._call()
+        with self._lock:
+            for cid in ids:
+                self.records.pop(cid, None)
+
+    def is_transient(self, error: Exception) -> bool:
+        return _is_network_error(error)
+
+
+_memory_store: InMemoryStore | None = None
+
+
+def get_vector_store() -> VectorStoreBackend | None:
+    """
+    The durable store selected by settings.VECTOR_STORE, or None when the
+    local FAISS index is the only store ("faiss").
+    """
+    global _memory_store
+
+    if settings.VECTOR_STORE == "pinecone":
+        return PineconeStore()
+    if settings.VECTOR_STORE == "memory":
+        if _memory_store is None:
+            _memory_store = InMemoryStore()
+        return _memory_store
+    if settings.VECTOR_STORE == "faiss":
+        return None
+
+    raise ValueError(f"Unknown vector store: {settings.VECTOR_STORE!r}")
+
+
+# -------------------
+# Retry & Concurrency Helpers
+# -------------------
+
+def _with_retry(
+    fn: Callable,
+    *args,
+    retry_if: Callable[[Exception], bool],
+    attempts: int = settings.VECTOR_STORE_RETRIES,
+    base_delay: float = 0.5,
+):
+    """
+    Call fn, retrying with exponential backoff and jitter on errors that
+    retry_if accepts (the store's is_transient); anything else is raised
+    at once.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == attempts - 1 or not retry_if(e):
+                raise
+            time.sleep(base_delay * (2 ** attempt) * (0.5 + random.random()))
+
+
+def _drain(pending: deque, limit: int) -> None:
+    """Block until at most `limit` futures are outstanding; surface errors."""
+    while len(pending) > limit:
+        pending.popleft().result()
+
+
+def pipelined_upsert(
+    stores: Sequence[VectorStoreBackend],
+    embeddings,
+    batches: Iterable[Tuple[List, List[str]]],
+    concurrency: int = settings.VECTOR_STORE_CONCURRENCY,
+) -> int:
+    """
+    Embed and upsert (documents, ids) batches, overlapping the embedding of
+    batch N+1 with the upload of batch N. Batches are pulled lazily and at
+    most `concurrency` uploads are in flight, which bounds how many embedded
+    batches are held in memory.
+    """
+    for store in stores:
+        store.ensure_index()
+
+    pending: deque[Future] = deque()
+    count = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for batch_docs, batch_ids in batches:
+            vectors = embeddings.embed_documents([d.page_content for d in batch_docs])
+            count += len(batch_docs)
+
+            _drain(pending, concurrency - 1)
+            for store in stores:
+                pending.append(
+                    pool.submit(
+                        _with_retry, store.upsert, batch_ids, vectors, batch_docs,
+                        retry_if=store.is_transient,
+                    )
+                )
+
+        _drain(pending, 0)
+
+    for store in stores:
+        store.flush()
+
+    return count
+
+
+def concurrent_delete(
+    store: VectorStoreBackend,
+    ids: List[str],
+    batch_size: int = 1000,
+    concurrency: int = settings.VECTOR_STORE_CONCURRENCY,
+) -> None:
+    """Delete in batches with bounded concurrency and retry/backoff."""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(_with_retry, store.delete, ids[i:i + batch_size], retry_if=store.is_transient)
+            for i in range(0, len(ids), batch_size)
+        ]
+        for future in futures:
+            future.result()
+
+    store.flush()
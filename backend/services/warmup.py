@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import Dict
+
+from backend.config import settings
+
+# Readiness of each heavy component; filled in by warm_up()
+_STATE: Dict = {
+    "embeddings": False,
+    "index": False,
+    "llm_client": False,
+    "error": None,
+    "warmup_ms": None,
+}
+
+
+def _load_embeddings() -> None:
+    from backend.services.embeddings import get_hf_embeddings
+
+    # One query also initializes the kernels / ONNX session
+    get_hf_embeddings().embed_query("warmup")
+    _STATE["embeddings"] = True
+
+
+def _load_index() -> None:
+    from backend.services.retriever import get_retriever
+
+    get_retriever()
+    _STATE["index"] = True
+
+
+def _load_llm_client() -> None:
+    # Importing the chat stack is most of the first-request cost
+    import langchain.chains  # noqa: F401
+    from langchain_openai import ChatOpenAI  # noqa: F401
+
+    _STATE["llm_client"] = True
+
+
+async def _warm_up_once() -> None:
+    steps = [
+        asyncio.to_thread(load)
+        for key, load in (("embeddings", _load_embeddings), ("llm_client", _load_llm_client))
+        if not _STATE[key]
+    ]
+    await asyncio.gather(*steps)
+    # The index needs the embedding model, so it goes after it
+    await asyncio.to_thread(_load_index)
+
+
+async def warm_up() -> None:
+    """
+    Load the embedding model, vector index and LLM client stack off the
+    event loop, so the first chat request does not pay for them.
+
+    A failed warm-up (no PDFs yet, another worker's build failing, ...) is
+    retried with backoff until it succeeds; components already loaded are
+    not loaded again.
+    """
+    start = time.perf_counter()
+    delay = settings.WARMUP_RETRY_S
+    while True:
+        try:
+            await _warm_up_once()
+            _STATE["error"] = None
+            break
+        except Exception as e:
+            _STATE["error"] = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Warmup failed (retrying in {delay:.0f}s):", e)
+        finally:
+            _STATE["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings.WARMUP_RETRY_MAX_S)
+
+
+def index_ready() -> bool:
+    """
+    True once this worker has an index open, whether warm-up opened it or
+    an upload or rebuild published one since.
+    """
+    from backend.services.retriever import is_index_open
+
+    return is_index_open()
+
+
+def is_ready() -> bool:
+    return _STATE["embeddings"] and _STATE["llm_client"] and index_ready()
+
+
+def readiness() -> Dict:
+    return {"ready": is_ready(), **_STATE, "index": index_ready()}
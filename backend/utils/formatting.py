@@ -1,4 +1,80 @@
 import re
+from typing import Optional
+
+# Known broken word splits (whitelist), matched case-insensitively.
+# "slow -he aling" used to be listed after "he aling", which always fixed
+# it first (-> "slow -healing"), so it never applied and is left out.
+_SPLIT_FIXES = {
+    "ur ination": "urination",
+    "Un int ended": "Unintended",
+    "Bl urred": "Blurred",
+    "Fat igue": "Fatigue",
+    "Ins ulin": "Insulin",
+    "strong ly": "strongly",
+    "sedent ary": "sedentary",
+    "he aling": "healing",
+}
+_FIX_REPLACEMENTS = list(_SPLIT_FIXES.values())
+
+_ANY_FIX = "|".join(re.escape(split) for split in _SPLIT_FIXES)
+
+# Characters a match can start with. Under IGNORECASE, "İ", "ı", "ſ" and
+# "K" (Kelvin) also match ASCII letters.
+_STARTS = "".join(sorted(
+    {c for split in _SPLIT_FIXES for c in (split[0].lower(), split[0].upper())}
+)) + "İıſK" + ".,!?;:\n"
+
+# One pass for every rule: a group per split fix, then punctuation missing
+# its space, then runs of blank lines. Only the fixes ignore case. A split
+# right after punctuation counts as a letter even when it starts with a
+# non-ASCII case variant ("İns ulin"), as it did when the fixes ran first.
+# The leading class lets the scan skip to candidate positions.
+_CLEANUP = re.compile(
+    rf"(?=[{re.escape(_STARTS)}])(?:"
+    + rf"\b(?i:{'|'.join(f'({re.escape(split)})' for split in _SPLIT_FIXES)})\b"
+    + rf"|([.,!?;:])(?=[A-Za-z0-9]|(?i:(?:{_ANY_FIX})\b))"
+    + r"|(\n{3,}))"
+)
+_PUNCT_GROUP = len(_SPLIT_FIXES) + 1
+
+
+def _nested_prefixes(word: str) -> str:
+    """Regex matching any non-empty prefix of `word`."""
+    tail = ""
+    for ch in reversed(word[1:]):
+        tail = f"(?:{re.escape(ch)}{tail})?"
+    return re.escape(word[0]) + tail
+
+
+# A split fix that may still be completed by the next token
+_PARTIAL_FIX = re.compile(
+    r"(?i:\b(?:" + "|".join(_nested_prefixes(split) for split in _SPLIT_FIXES) + r"))\Z"
+)
+_MAX_FIX_LEN = max(len(split) for split in _SPLIT_FIXES)
+_PUNCT = frozenset(".,!?;:")
+
+
+def _cleanup_match(m: re.Match) -> str:
+    group = m.lastindex
+    if group < _PUNCT_GROUP:
+        return _FIX_REPLACEMENTS[group - 1]
+    if group == _PUNCT_GROUP:
+        return m.group() + " "
+    return "\n\n"
+
+
+def _cleanup(text: str, start: int, end: int) -> str:
+    """Apply the cleanup rules to text[start:end], seeing the text around it."""
+    parts, last = [], start
+    for m in _CLEANUP.finditer(text, start):
+        if m.start() >= end:
+            break
+        parts.append(text[last:m.start()])
+        parts.append(_cleanup_match(m))
+        last = m.end()
+    parts.append(text[last:end])
+    return "".join(parts)
+
 
 def clean_spacing(text: str) -> str:
     """
@@ -10,26 +86,82 @@ def clean_spacing(text: str) -> str:
     if not text:
         return text
 
-    # 1) Fix a small, safe list of known broken splits (whitelist)
-    fixes = {
-        r"\bur ination\b": "urination",
-        r"\bUn int ended\b": "Unintended",
-        r"\bBl urred\b": "Blurred",
-        r"\bFat igue\b": "Fatigue",
-        r"\bIns ulin\b": "Insulin",
-        r"\bstrong ly\b": "strongly",
-        r"\bsedent ary\b": "sedentary",
-        r"\bhe aling\b": "healing",
-        r"\bslow -he aling\b": "slow-healing",
-    }
-    for pat, repl in fixes.items():
-        text = re.sub(pat, repl, text, flags=re.IGNORECASE)
-
-    # 2) Ensure space after punctuation when missing (but keep newlines)
-    text = re.sub(r'([.,!?;:])(?=[A-Za-z0-9])', r'\1 ', text)
-
-    # 3) Normalize repeated blank lines to at most two
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    # 1) Fix known broken splits, 2) ensure a space after punctuation when
+    # missing (but keep newlines), 3) normalize blank lines to at most two
+    text = _CLEANUP.sub(_cleanup_match, text)
 
     # keep leading/trailing newlines intact for markdown rendering, but trim extra spaces
     return text.strip()
+
+
+class StreamingNormalizer:
+    """
+    clean_spacing() applied incrementally to a token stream.
+
+    feed() returns the cleaned text that can no longer change. It holds back
+    only what the next token could still affect: a possible start of a
+    broken split ("Ins" before " ulin"), a trailing punctuation mark, and
+    trailing whitespace (a blank-line run, or the end of the answer).
+    flush() returns the rest. The concatenated output equals
+    clean_spacing() of the concatenated input.
+
+    Output is never whitespace-only: such a piece is held and sent in
+    front of the next one, so callers that skip blank chunks lose nothing.
+    """
+
+    def __init__(self):
+        self._pending = ""  # raw text not emitted yet
+        self._prev = ""  # last raw character emitted, for \b at the cut
+        self._held = ""  # cleaned whitespace-only output not returned yet
+        self._started = False  # leading whitespace is dropped
+
+    def feed(self, chunk: str) -> str:
+        if not self._started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return ""
+            self._started = True
+
+        text = self._prev + self._pending + chunk
+        start = len(self._prev)
+        cut = self._safe_end(text, start)
+
+        out = self._held + _cleanup(text, start, cut)
+        if cut > start:
+            self._prev = text[cut - 1]
+        self._pending = text[cut:]
+        if out.isspace():
+            self._held, out = out, ""
+        else:
+            self._held = ""
+        return out
+
+    def flush(self) -> str:
+        text = self._prev + self._pending
+        out = (self._held + _cleanup(text, len(self._prev), len(text))).rstrip()
+        self.__init__()
+        return out
+
+    @staticmethod
+    def _safe_end(text: str, start: int) -> int:
+        cut = len(text)
+        while cut > start and text[cut - 1].isspace():
+            cut -= 1
+        if cut > start and text[cut - 1] in _PUNCT and cut == len(text):
+            cut -= 1
+
+        partial: Optional[re.Match] = _PARTIAL_FIX.search(text, max(start, len(text) - _MAX_FIX_LEN))
+        if partial is not None:
+            cut = min(cut, partial.start())
+            if cut > start and text[cut - 1] in _PUNCT:
+                cut -= 1  # its missing space depends on how the split ends
+        return cut
+
+
+def normalize_question(text: str) -> str:
+    """
+    Canonical form used to detect repeated questions (coalescing, caches):
+    case-folded, whitespace collapsed, trailing punctuation dropped.
+    """
+    text = re.sub(r"\s+", " ", text or "").strip().casefold()
+    return text.rstrip(" ?!.")
@@ -1,8 +1,18 @@
+from __future__ import annotations
+
+import glob
+import gzip
+import hashlib
+import json
+import os
 import re
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
-from typing import List
+import tempfile
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List
+
+# pypdf / langchain loaders are imported where used to keep startup light
+if TYPE_CHECKING:
+    from langchain.schema import Document
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
 
@@ -18,15 +28,94 @@ def clean_spacing(text: str) -> str:
 
     return text.strip()
 
-def load_pdf_folder(path: str):
-    loader = DirectoryLoader(path, glob="*.pdf", loader_cls=PyPDFLoader)
-    docs = loader.load()
+# -------------------
+# Parsed-page cache
+# -------------------
+# Extracted + cleaned page text is cached per file content hash, so an
+# unchanged PDF is never parsed twice. Bump _PARSER_VERSION whenever
+# clean_spacing or the extraction settings change.
+
+PAGE_CACHE_DIR = os.path.join("storage", "page_cache")
+_PARSER_VERSION = 1
+
+_TOKEN_ENCODING = "cl100k_base"  # used when chunks are sized by tokens
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_path(sha: str) -> str:
+    import pypdf
+
+    return os.path.join(
+        PAGE_CACHE_DIR, f"{sha}-p{_PARSER_VERSION}-pypdf{pypdf.__version__}.jsonl.gz"
+    )
+
+
+def _iter_page_cache(path: str) -> Iterator[Dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _iter_extracted_pages(path: str, sha: str) -> Iterator[Dict]:
+    """
+    Parse a PDF page by page, writing the page cache as we go. The cache
+    file only becomes visible once the whole PDF has been parsed.
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=PAGE_CACHE_DIR, prefix=".page-cache-")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            for d in PyPDFLoader(path).lazy_load():
+                meta = {k: v for k, v in d.metadata.items() if k != "source"}
+                # ✅ Apply cleaning to every extracted page
+                page = {"text": clean_spacing(d.page_content), "metadata": meta}
+                f.write(json.dumps(page, ensure_ascii=False, separators=(",", ":")) + "\n")
+                yield page
+        os.replace(tmp, _cache_path(sha))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def list_pdfs(path: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(path, "*.pdf")))
+
+
+def iter_pdf_pages(path: str, sha: str | None = None) -> Iterator[Document]:
+    """
+    Lazily yield one PDF's cleaned pages, from the page cache when the
+    file's content hash (and parser version) has been seen before.
+    """
+    from langchain.schema import Document
+
+    sha = sha or file_sha256(path)
+    cached = _cache_path(sha)
+    pages = _iter_page_cache(cached) if os.path.exists(cached) else _iter_extracted_pages(path, sha)
+
+    for p in pages:
+        yield Document(page_content=p["text"], metadata={"source": path, **p["metadata"]})
+
+
+def load_pdf_file(path: str, sha: str | None = None) -> List[Document]:
+    return list(iter_pdf_pages(path, sha))
 
-    # ✅ Apply cleaning to every extracted page
-    for d in docs:
-        d.page_content = clean_spacing(d.page_content)
 
-    return docs
+def iter_pdf_folder(path: str) -> Iterator[Document]:
+    for pdf in list_pdfs(path):
+        yield from iter_pdf_pages(pdf)
+
+
+def load_pdf_folder(path: str):
+    return list(iter_pdf_folder(path))
 
 def split_documents(
     documents: List[Document],
@@ -36,10 +125,86 @@ def split_documents(
     """
     Split documents into smaller overlapping chunks for embeddings.
     """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
 
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap
     )
 
-    return splitter.split_documents(documents)
\ No newline at end of file
+    return splitter.split_documents(documents)
+
+
+def _make_splitter(
+    chunk_size: int,
+    chunk_overlap: int,
+    by_tokens: bool,
+) -> tuple[RecursiveCharacterTextSplitter, Callable[[str], str]]:
+    """
+    Splitter plus a function returning the last `chunk_overlap` units of a
+    chunk, measured in characters or in tiktoken tokens.
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    if not by_tokens:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+
+        def tail(text: str) -> str:
+            cut = text[-chunk_overlap:]
+            # start the carried overlap on a word boundary
+            space = cut.find(" ")
+            return cut[space + 1:] if 0 <= space < len(cut) - 1 else cut
+
+        return splitter, tail
+
+    import tiktoken
+
+    encoding = tiktoken.get_encoding(_TOKEN_ENCODING)
+    splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name=_TOKEN_ENCODING,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+    def tail(text: str) -> str:
+        return encoding.decode(encoding.encode(text)[-chunk_overlap:])
+
+    return splitter, tail
+
+
+def iter_split_documents(
+    pages: Iterable[Document],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    by_tokens: bool = False,
+) -> Iterator[Document]:
+    """
+    Streaming counterpart of split_documents: consumes pages lazily and
+    yields chunks as soon as each page is split, so only one page is held
+    at a time.
+
+    The last `chunk_overlap` units of a page are carried into the next page
+    of the same source, so context spanning a page break is not lost.
+    Chunks are measured in characters, or in tokens when by_tokens is set.
+    """
+    from langchain.schema import Document
+
+    splitter, tail = _make_splitter(chunk_size, chunk_overlap, by_tokens)
+
+    carry, carry_source = "", None
+
+    for page in pages:
+        source = page.metadata.get("source")
+        text = page.page_content
+        if carry and source == carry_source:
+            text = f"{carry} {text}"
+
+        pieces = splitter.split_text(text)
+        for piece in pieces:
+            yield Document(page_content=piece, metadata=dict(page.metadata))
+
+        carry = tail(pieces[-1]) if pieces and chunk_overlap else ""
+        carry_source = source
@@ -0,0 +1,104 @@
+import asyncio
+import json
+from typing import AsyncGenerator, AsyncIterable, Callable, Optional
+
+_END = object()
+
+
+def is_sendable(chunk: str) -> bool:
+    """
+    Whether a stream chunk is sent to the client. Only empty chunks are
+    dropped: a whitespace-only token (" ") is part of the answer.
+    """
+    return bool(chunk)
+
+
+def sse_frame(data: str) -> bytes:
+    return f"data: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+async def coalesce_tokens(
+    tokens: AsyncIterable[str],
+    interval_s: float,
+    max_chars: int,
+    standalone: Optional[Callable[[str], bool]] = None,
+) -> AsyncGenerator[str, None]:
+    """
+    Batch a token stream into fewer, larger pieces for SSE framing.
+
+    - The first token is emitted immediately (time-to-first-token is unchanged).
+    - After that, tokens are buffered and emitted once `interval_s` has passed
+      since the buffer started, or once it holds `max_chars` characters.
+    - Chunks for which `standalone(chunk)` is true (e.g. the final sources
+      JSON) flush the buffer and are emitted on their own.
+
+    interval_s <= 0 disables batching: every token is passed straight through.
+    """
+    if interval_s <= 0:
+        async for token in tokens:
+            yield token
+        return
+
+    # A pump task reads the upstream and does the buffering; the consumer
+    # only wakes once per emitted piece. A timer flushes a pending buffer on
+    # schedule even while the upstream is quiet. Everything runs on the event
+    # loop thread, so the shared buffer needs no locking.
+    loop = asyncio.get_running_loop()
+    pieces: asyncio.Queue = asyncio.Queue()
+    buffer: list = []
+    size = 0
+    timer = None
+
+    def flush() -> None:
+        nonlocal buffer, size, timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        if buffer:
+            pieces.put_nowait("".join(buffer))
+            buffer, size = [], 0
+
+    def on_timer() -> None:
+        nonlocal timer
+        timer = None
+        flush()
+
+    async def pump() -> None:
+        nonlocal size, timer
+        first = True
+        try:
+            async for token in tokens:
+                if first:
+                    first = False
+                    pieces.put_nowait(token)
+                elif standalone is not None and standalone(token):
+                    flush()
+                    pieces.put_nowait(token)
+                else:
+                    buffer.append(token)
+                    size += len(token)
+                    if size >= max_chars:
+                        flush()
+                    elif timer is None:
+                        timer = loop.call_later(interval_s, on_timer)
+            flush()
+        except Exception as e:
+            flush()
+            pieces.put_nowait(e)
+        finally:
+            pieces.put_nowait(_END)
+
+    pump_task = asyncio.create_task(pump())
+
+    try:
+        while True:
+            item = await pieces.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if timer is not None:
+            timer.cancel()
+        pump_task.cancel()